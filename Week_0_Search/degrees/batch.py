@@ -0,0 +1,193 @@
+import argparse
+import csv
+import json
+import sys
+import time
+
+import degrees
+import landmarks
+import nameindex
+import parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer degrees queries in bulk.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("queries", nargs="?", default="-",
+                        help="file of source/target pairs (default: stdin)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of worker processes (default: 1)")
+    parser.add_argument("--cache-mb", type=int, default=0,
+                        help="cache breadth-first trees by source, up to this many MB")
+    parser.add_argument("--count-only", action="store_true",
+                        help="report degrees without paths, using the landmark index")
+    args = parser.parse_args()
+
+    # Load data from files into memory
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, compact=True, progress=print_progress)
+    if args.cache_mb > 0:
+        degrees.enable_cache(args.cache_mb * 1024 * 1024)
+    index = landmarks.load_index(args.directory, degrees.graph) if args.count_only else None
+    print("Data loaded.", file=sys.stderr)
+
+    if args.queries != "-":
+        with open(args.queries, encoding="utf-8") as f:
+            latencies, seconds, hits, errors = run(f, sys.stdout, args.workers, args.directory, index)
+    else:
+        latencies, seconds, hits, errors = run(sys.stdin, sys.stdout, args.workers, args.directory, index)
+    report(latencies, seconds, hits, errors)
+
+
+def run(lines, out, workers=1, directory=None, index=None):
+    """
+    Answers every query in lines, writing one JSON result per line to out.
+    Source groups are spread across workers processes if more than one.
+    If a landmark index is given, only the degrees are reported.
+
+    Returns the per-query latencies and the total elapsed time, in
+    seconds, a list of whether each group's tree was a cache hit, and
+    the number of queries that were malformed or whose names could not
+    be resolved, which have no latency.
+    """
+    start = time.perf_counter()
+    latencies = []
+    hits = []
+    errors = 0
+    groups = {}
+    resolved = {}
+    for number, source, target, error in read_queries(lines):
+        if error is not None:
+            write_result(out, {"line": number, "error": error})
+            errors += 1
+            continue
+        query = {"line": number, "source": source, "target": target}
+        try:
+            source_id = resolve(source, resolved)
+            target_id = resolve(target, resolved)
+        except LookupError as e:
+            query["error"] = str(e)
+            write_result(out, query)
+            errors += 1
+            continue
+        if index is not None:
+            query_start = time.perf_counter()
+            query["degrees"] = index.degree(source_id, target_id)
+            latencies.append(time.perf_counter() - query_start)
+            write_result(out, query)
+            continue
+        groups.setdefault(source_id, []).append((query, target_id))
+
+    work = [(source_id, [target_id for _, target_id in group])
+            for source_id, group in groups.items()]
+    for source_id, paths, group_latencies, cached in parallel.solve_groups(work, workers, directory):
+        if cached is not None:
+            hits.append(cached)
+        for (query, _), path, seconds in zip(groups[source_id], paths, group_latencies):
+            query["degrees"] = None if path is None else len(path)
+            query["path"] = path
+            write_result(out, query)
+            latencies.append(seconds)
+    return latencies, time.perf_counter() - start, hits, errors
+
+
+def read_queries(lines):
+    """
+    Yields (line number, source, target, error) for each query in lines,
+    where error is None, or a message (with source and target None) if
+    the line is malformed.
+
+    Each line is either a JSON object with "source" and "target" keys,
+    a JSON list of two names, or a CSV row of two names. Names may also
+    be person IDs. Blank lines and a "source,target" header are skipped.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] in "{[":
+            try:
+                query = json.loads(line)
+            except ValueError as e:
+                yield number, None, None, f"invalid JSON: {e}"
+                continue
+            if isinstance(query, dict):
+                query = [query.get("source"), query.get("target")]
+        else:
+            query = next(csv.reader([line]))
+            if number == 1 and [field.strip().lower() for field in query] == ["source", "target"]:
+                continue
+        if not isinstance(query, list) or len(query) != 2 or None in query:
+            yield number, None, None, "expected a source and a target"
+            continue
+        yield number, str(query[0]).strip(), str(query[1]).strip(), None
+
+
+def resolve(name, resolved):
+    """
+    Returns the person_id for a name or person ID, remembering the
+    answer in resolved so that each distinct name is only looked up once.
+
+    Raises LookupError if the name is unknown or ambiguous.
+    """
+    if name not in resolved:
+        if name in degrees.people:
+            resolved[name] = [name]
+        else:
+            resolved[name] = sorted(degrees.names.get(name.lower(), set()))
+    person_ids = resolved[name]
+    if not person_ids:
+        graph = degrees.graph
+        suggestions = [graph.person_names[person] for person in nameindex.suggest(graph, name, 3)]
+        if suggestions:
+            raise LookupError(f"person not found: {name} (did you mean: {', '.join(suggestions)})")
+        raise LookupError(f"person not found: {name}")
+    if len(person_ids) > 1:
+        raise LookupError(f"ambiguous name: {name} ({', '.join(person_ids)})")
+    return person_ids[0]
+
+
+def print_progress(filename, rows, done, total):
+    """
+    Prints how far loading has got through one CSV file to stderr.
+    """
+    print(f"{filename}: {rows} rows, {100 * done / total if total else 100:.0f}%",
+          file=sys.stderr)
+
+
+def write_result(out, query):
+    """
+    Writes one query result as a line of JSON and flushes it.
+    """
+    out.write(json.dumps(query) + "\n")
+    out.flush()
+
+
+def report(latencies, seconds, hits=(), errors=0):
+    """
+    Prints latency percentiles and throughput for a batch to stderr,
+    and the tree cache's hits and misses, counted across all workers.
+    Malformed and unresolved queries are counted but left out of the
+    percentiles and throughput.
+    """
+    count = len(latencies)
+    print(f"{count} queries in {seconds:.3f}s "
+          f"({count / seconds if seconds else 0:.1f} queries/s)", file=sys.stderr)
+    if errors:
+        print(f"{errors} queries were malformed or failed to resolve", file=sys.stderr)
+    if count:
+        latencies = sorted(latencies)
+        for percentile in (50, 90, 99):
+            latency = latencies[min(count - 1, count * percentile // 100)]
+            print(f"p{percentile} latency: {latency * 1000:.3f}ms", file=sys.stderr)
+    if degrees.cache is not None:
+        # Workers keep their own caches, so only the counts are combined
+        line = f"tree cache: {sum(hits)} hits, {len(hits) - sum(hits)} misses"
+        stats = degrees.cache.stats()
+        if stats["trees"]:
+            line += f", {stats['trees']} trees in {stats['bytes'] / 1024 / 1024:.1f}MB"
+        print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+# Memory cap used when none is given, in bytes
+MAX_BYTES = 256 * 1024 * 1024
+
+
+class TreeCache():
+    """
+    Bounded least-recently-used cache of breadth-first trees, keyed by
+    source person_id, so that repeated queries from the same source
+    only need to walk the tree back from the target.
+
+    Each tree holds three int32 arrays over every person, so the cache
+    evicts the least recently used trees whenever their total size
+    would exceed max_bytes.
+    """
+
+    def __init__(self, graph, max_bytes=MAX_BYTES):
+        self.graph = graph
+        self.max_bytes = max_bytes
+        self.trees = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def tree(self, source_id):
+        """
+        Returns the full breadth-first tree rooted at a person_id,
+        growing and caching it if it is not already cached.
+        """
+        if source_id in self.trees:
+            self.hits += 1
+            self.trees.move_to_end(source_id)
+            return self.trees[source_id]
+
+        self.misses += 1
+        tree = self.graph.bfs_tree(self.graph.person(source_id))
+        size = tree_bytes(tree)
+        if size <= self.max_bytes:
+            while self.bytes + size > self.max_bytes:
+                _, evicted = self.trees.popitem(last=False)
+                self.bytes -= tree_bytes(evicted)
+            self.trees[source_id] = tree
+            self.bytes += size
+        return tree
+
+    def path(self, source_id, target_id):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, or None.
+        """
+        return self.graph.tree_path(self.tree(source_id), self.graph.person(target_id))
+
+    def stats(self):
+        """
+        Returns the cache's hit and miss counters and current size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "trees": len(self.trees),
+            "bytes": self.bytes
+        }
+
+
+def tree_bytes(tree):
+    """
+    Returns the memory held by a tree's arrays, in bytes.
+    """
+    return sum(
+        len(values) * values.itemsize for values in (tree.depth, tree.parent, tree.via)
+    )
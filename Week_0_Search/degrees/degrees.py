@@ -1,7 +1,13 @@
 import csv
+import os
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+import loader
+import nameindex
+import snapshot
+from cache import TreeCache
+from graph import Graph, Movies, Names, People
+from util import Node, DequeQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,10 +18,64 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed adjacency compiled from people and movies, if requested
+graph = None
 
-def load_data(directory):
+# Cache of breadth-first trees by source over graph, if enabled
+cache = None
+
+# Name of the binary snapshot of the graph cached in each data directory
+SNAPSHOT = "degrees.snapshot"
+
+
+def load_data(directory, compact=False, progress=None):
     """
     Load data from CSV files into memory.
+
+    If compact is true, the data is instead streamed into an integer
+    co-star graph that shortest_path searches, calling progress as
+    described in loader.load_graph. The graph is cached as a binary
+    snapshot in the data directory and reused for as long as the CSV
+    files are unchanged. names, people and movies then become read-only
+    views over the graph.
+    """
+    global graph, cache, names, people, movies
+
+    names, people, movies = {}, {}, {}
+    graph = None
+    cache = None
+    if not compact:
+        read_csv(directory)
+        return
+
+    source_stamp = snapshot.stamp(directory)
+    path = os.path.join(directory, SNAPSHOT)
+    graph = Graph.load(path, source_stamp)
+    if graph is None:
+        graph = loader.load_graph(directory, progress)
+        try:
+            graph.save(path, source_stamp)
+        except OSError:
+            pass
+    names, people, movies = Names(graph), People(graph), Movies(graph)
+
+
+def enable_cache(max_bytes=None):
+    """
+    Cache the breadth-first tree of each source that shortest_path is
+    asked about, up to max_bytes in total, so that later queries from
+    the same source are answered from the tree. Requires compact data.
+    """
+    global cache
+    if graph is None:
+        raise ValueError("the tree cache requires load_data(directory, compact=True)")
+    cache = TreeCache(graph) if max_bytes is None else TreeCache(graph, max_bytes)
+    return cache
+
+
+def read_csv(directory):
+    """
+    Fill names, people and movies from the CSV files in directory.
     """
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
@@ -59,7 +119,7 @@ def main():
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, compact=True)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -84,47 +144,146 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=True):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
     """
+    if cache is not None:
+        return cache.path(source, target)
+    if graph is not None:
+        return graph.shortest_path(source, target)
+    if bidirectional:
+        return bidirectional_search(source, target)
+    return breadth_first_search(source, target)
+
 
-    # TODO
-    num_explored = 0
-    frontier = QueueFrontier()
-    print(source, target)
-    Start_node = Node(state=source, parent=None, action=None)
-    frontier.add(Start_node)
-    while True:
+def breadth_first_search(source, target):
+    """
+    Returns the shortest path from source to target by growing
+    a single breadth-first frontier out of the source.
+    """
+    frontier = DequeQueueFrontier()
+    frontier.add(Node(state=source, parent=None, action=None))
+    explored = {source}
+    while not frontier.empty():
         node = frontier.remove()
-        num_explored += 1
         if node.state == target:
-            to_return = []
+            path = []
             while node.parent is not None:
-                to_return.append((node.action, node.state))
+                path.append((node.action, node.state))
                 node = node.parent
-            to_return.reverse()
-            print(to_return)
-            return to_return
-        possible = neighbors_for_person(node.state)
-        for item in possible:
-            new_node = Node(state=item[1], parent=node, action=item[0])
-            frontier.add(new_node)
+            path.reverse()
+            return path
+        for movie_id, person_id in neighbors_for_person(node.state):
+            if person_id not in explored:
+                explored.add(person_id)
+                frontier.add(Node(state=person_id, parent=node, action=movie_id))
+    return None
+
+
+def bidirectional_search(source, target):
+    """
+    Returns the shortest path from source to target by growing one
+    breadth-first frontier from each end, one layer at a time, and
+    stopping at the first layer in which the two frontiers touch.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached person to (movie_id, person_id) one step closer
+    # to the side that reached them, plus their distance from that side
+    forward = {source: None}
+    backward = {target: None}
+    forward_depth = {source: 0}
+    backward_depth = {target: 0}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+
+        # Always grow the smaller frontier
+        if len(forward_layer) <= len(backward_layer):
+            forward_layer, meeting = expand_layer(
+                forward_layer, forward, forward_depth, backward_depth
+            )
+        else:
+            backward_layer, meeting = expand_layer(
+                backward_layer, backward, backward_depth, forward_depth
+            )
+        if meeting is not None:
+            return join_paths(meeting, forward, backward)
+    return None
+
+
+def expand_layer(layer, parents, depth, other_depth):
+    """
+    Expands every person in a frontier layer by one step.
+
+    Returns the next layer, and the person at which this side met the
+    other side along the shortest combined path (or None).
+    """
+    next_layer = []
+    meeting = None
+    best = None
+    for person_id in layer:
+        for movie_id, neighbor in neighbors_for_person(person_id):
+            if neighbor in parents:
+                continue
+            parents[neighbor] = (movie_id, person_id)
+            depth[neighbor] = depth[person_id] + 1
+            next_layer.append(neighbor)
+            if neighbor in other_depth:
+                total = depth[neighbor] + other_depth[neighbor]
+                if best is None or total < best:
+                    best = total
+                    meeting = neighbor
+    return next_layer, meeting
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Joins the forward and backward parent chains at the meeting person
+    into a list of (movie_id, person_id) pairs from source to target.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, previous = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = previous
+    path.reverse()
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, following = backward[person_id]
+        path.append((movie_id, following))
+        person_id = following
+    return path
 
 
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    With compact data, a name without an exact match offers the closest
+    names from the name index to choose from instead.
     """
     person_ids = list(names.get(name.lower(), set()))
+    suggested = False
+    if len(person_ids) == 0 and graph is not None:
+        person_ids = [graph.person_ids[person] for person in nameindex.suggest(graph, name)]
+        suggested = True
     if len(person_ids) == 0:
         return None
-    elif len(person_ids) > 1:
-        print(f"Which '{name}'?")
+    elif len(person_ids) > 1 or suggested:
+        if suggested:
+            print(f"No exact match for '{name}'. Did you mean:")
+        else:
+            print(f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
             name = person["name"]
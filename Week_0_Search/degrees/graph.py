@@ -0,0 +1,380 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+
+import nameindex
+import snapshot
+
+
+class Graph():
+    """
+    Compact co-star graph over integer person and movie indices.
+
+    Adjacency is stored in compressed-sparse-row form: the movies of
+    person p are person_movies[person_offsets[p]:person_offsets[p + 1]]
+    and the stars of movie m are movie_stars[movie_offsets[m]:movie_offsets[m + 1]].
+    All four are int32 arrays. People and movies are numbered in sorted
+    order of their string IDs, which are kept with names and titles in
+    parallel string tables for translating at the edges. Birth and
+    release years are int16 columns, with 0 where the year is unknown.
+    The name index columns are described in nameindex.build.
+    """
+
+    ARRAYS = ("person_offsets", "person_movies", "movie_offsets",
+              "movie_stars", "person_births", "movie_years", "name_order",
+              "name_starts", "trigram_offsets", "trigram_names")
+    STRINGS = ("person_ids", "person_names", "movie_ids", "movie_titles",
+               "trigrams")
+
+    def __init__(self, columns):
+        for name in Graph.ARRAYS + Graph.STRINGS:
+            setattr(self, name, columns[name])
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Compiles the people and movies dictionaries built by
+        load_data into a Graph.
+        """
+        person_ids = sorted(people)
+        movie_ids = sorted(movies)
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        person_offsets = array("i", [0])
+        person_movies = array("i")
+        for person_id in person_ids:
+            person_movies.extend(sorted(
+                movie_index[movie_id] for movie_id in people[person_id]["movies"]
+            ))
+            person_offsets.append(len(person_movies))
+
+        movie_offsets = array("i", [0])
+        movie_stars = array("i")
+        for movie_id in movie_ids:
+            movie_stars.extend(sorted(
+                person_index[person_id] for person_id in movies[movie_id]["stars"]
+            ))
+            movie_offsets.append(len(movie_stars))
+
+        person_names = [people[person_id]["name"] for person_id in person_ids]
+
+        return cls({
+            "person_offsets": person_offsets,
+            "person_movies": person_movies,
+            "movie_offsets": movie_offsets,
+            "movie_stars": movie_stars,
+            "person_ids": person_ids,
+            "person_names": person_names,
+            "person_births": array("h", [
+                parse_year(people[person_id]["birth"]) for person_id in person_ids
+            ]),
+            "movie_ids": movie_ids,
+            "movie_titles": [movies[movie_id]["title"] for movie_id in movie_ids],
+            "movie_years": array("h", [
+                parse_year(movies[movie_id]["year"]) for movie_id in movie_ids
+            ]),
+            **nameindex.build(person_names)
+        })
+
+    @classmethod
+    def load(cls, path, source_stamp):
+        """
+        Returns the Graph stored in a snapshot file, or None if there is
+        no usable snapshot for source_stamp.
+        """
+        columns = snapshot.load(path, source_stamp)
+        if columns is None or set(columns) != set(Graph.ARRAYS + Graph.STRINGS):
+            return None
+        return cls(columns)
+
+    def save(self, path, source_stamp):
+        """
+        Writes the Graph to a snapshot file.
+        """
+        snapshot.save(path, source_stamp, {
+            name: getattr(self, name) for name in Graph.ARRAYS + Graph.STRINGS
+        })
+
+    def person(self, person_id):
+        """
+        Returns the index of a person_id, raising KeyError if unknown.
+        """
+        i = bisect_left(self.person_ids, person_id)
+        if i == len(self.person_ids) or self.person_ids[i] != person_id:
+            raise KeyError(person_id)
+        return i
+
+    def movie(self, movie_id):
+        """
+        Returns the index of a movie_id, raising KeyError if unknown.
+        """
+        i = bisect_left(self.movie_ids, movie_id)
+        if i == len(self.movie_ids) or self.movie_ids[i] != movie_id:
+            raise KeyError(movie_id)
+        return i
+
+    def people_named(self, name):
+        """
+        Returns the indices of the people whose lowercased name is name.
+        """
+        key = self.person_key
+        start = bisect_left(self.name_order, name, key=key)
+        end = bisect_right(self.name_order, name, lo=start, key=key)
+        return self.name_order[start:end]
+
+    def person_key(self, person):
+        """
+        Returns the key name_order is sorted by for a person index.
+        """
+        return self.person_names[person].lower()
+
+    def movies_of(self, person):
+        """
+        Returns the movie indices a person index starred in.
+        """
+        return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Returns the person indices that starred in a movie index.
+        """
+        return self.movie_stars[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people
+        who starred with a given person index.
+        """
+        for movie in self.movies_of(person):
+            for star in self.stars_of(movie):
+                yield movie, star
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source person_id to the target person_id.
+
+        Runs a bidirectional breadth-first search over the adjacency
+        arrays. If no possible path, returns None.
+        """
+        source = self.person(source)
+        target = self.person(target)
+        if source == target:
+            return []
+
+        n = len(self.person_ids)
+        forward = SearchSide(n, source)
+        backward = SearchSide(n, target)
+        while forward.layer and backward.layer:
+            if len(forward.layer) <= len(backward.layer):
+                meeting = self.expand_layer(forward, backward)
+            else:
+                meeting = self.expand_layer(backward, forward)
+            if meeting is not None:
+                return self.join_paths(meeting, forward, backward)
+        return None
+
+    def expand_layer(self, side, other):
+        """
+        Expands every person in one side's frontier layer by one step.
+
+        Returns the person index at which this side met the other side
+        along the shortest combined path, or None.
+        """
+        depth = side.depth
+        parent = side.parent
+        via = side.via
+        other_depth = other.depth
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        next_layer = []
+        meeting = None
+        best = None
+        for person in side.layer:
+            d = depth[person] + 1
+            for movie in self.movies_of(person):
+                for star in movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                    if depth[star] >= 0:
+                        continue
+                    depth[star] = d
+                    parent[star] = person
+                    via[star] = movie
+                    next_layer.append(star)
+                    if other_depth[star] >= 0:
+                        total = d + other_depth[star]
+                        if best is None or total < best:
+                            best = total
+                            meeting = star
+        side.layer = next_layer
+        return meeting
+
+    def join_paths(self, meeting, forward, backward):
+        """
+        Joins the forward and backward parent chains at the meeting
+        person into a list of (movie_id, person_id) pairs.
+        """
+        path = []
+        person = meeting
+        while forward.parent[person] >= 0:
+            path.append((self.movie_ids[forward.via[person]], self.person_ids[person]))
+            person = forward.parent[person]
+        path.reverse()
+
+        person = meeting
+        while backward.parent[person] >= 0:
+            following = backward.parent[person]
+            path.append((self.movie_ids[backward.via[person]], self.person_ids[following]))
+            person = following
+        return path
+
+    def bfs_tree(self, source, targets=()):
+        """
+        Runs a breadth-first search from a source person index and
+        returns the resulting SearchSide, whose parent and via arrays
+        form a shortest-path tree rooted at the source.
+
+        If targets (person indices) are given, the search stops once all
+        of them have been reached; otherwise it covers the whole component.
+        """
+        tree = SearchSide(len(self.person_ids), source)
+        depth = tree.depth
+        parent = tree.parent
+        via = tree.via
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        remaining = {target for target in targets if target != source}
+        while tree.layer:
+            next_layer = []
+            for person in tree.layer:
+                d = depth[person] + 1
+                for movie in self.movies_of(person):
+                    for star in movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                        if depth[star] >= 0:
+                            continue
+                        depth[star] = d
+                        parent[star] = person
+                        via[star] = movie
+                        next_layer.append(star)
+                        remaining.discard(star)
+            tree.layer = next_layer
+            if targets and not remaining:
+                break
+        return tree
+
+    def tree_path(self, tree, target):
+        """
+        Returns the list of (movie_id, person_id) pairs leading from the
+        root of a bfs_tree to a target person index, or None if the tree
+        does not reach the target.
+        """
+        if tree.depth[target] < 0:
+            return None
+        path = []
+        person = target
+        while tree.parent[person] >= 0:
+            path.append((self.movie_ids[tree.via[person]], self.person_ids[person]))
+            person = tree.parent[person]
+        path.reverse()
+        return path
+
+
+def parse_year(value):
+    """
+    Returns a year column entry for a CSV year field, 0 if it is empty.
+    """
+    return int(value) if value.strip().isdigit() else 0
+
+
+def format_year(year):
+    """
+    Returns the CSV year field for a year column entry.
+    """
+    return str(year) if year else ""
+
+
+class SearchSide():
+    """
+    Per-person depth, parent and connecting movie arrays for one
+    direction of a breadth-first search, plus its current layer.
+    """
+    def __init__(self, n, start):
+        self.depth = array("i", [-1]) * n
+        self.parent = array("i", [-1]) * n
+        self.via = array("i", [-1]) * n
+        self.depth[start] = 0
+        self.layer = [start]
+
+
+class People(Mapping):
+    """
+    Read-only view of a Graph shaped like the people dict: maps each
+    person_id to a dictionary of: name, birth, movies (a set of movie_ids).
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person(person_id)
+        return {
+            "name": graph.person_names[person],
+            "birth": format_year(graph.person_births[person]),
+            "movies": {graph.movie_ids[movie] for movie in graph.movies_of(person)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+
+class Movies(Mapping):
+    """
+    Read-only view of a Graph shaped like the movies dict: maps each
+    movie_id to a dictionary of: title, year, stars (a set of person_ids).
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie(movie_id)
+        return {
+            "title": graph.movie_titles[movie],
+            "year": format_year(graph.movie_years[movie]),
+            "stars": {graph.person_ids[star] for star in graph.stars_of(movie)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+
+class Names(Mapping):
+    """
+    Read-only view of a Graph shaped like the names dict: maps each
+    lowercased name to a set of corresponding person_ids.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        graph = self.graph
+        people = graph.people_named(name)
+        if not len(people):
+            raise KeyError(name)
+        return {graph.person_ids[person] for person in people}
+
+    def __iter__(self):
+        graph = self.graph
+        for start in graph.name_starts[:-1]:
+            yield graph.person_key(graph.name_order[start])
+
+    def __len__(self):
+        return len(self.graph.name_starts) - 1
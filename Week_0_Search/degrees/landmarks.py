@@ -0,0 +1,166 @@
+import math
+import os
+import sys
+from array import array
+
+import degrees
+import snapshot
+
+# Name of the landmark index cached in each data directory
+INDEX = "degrees.landmarks"
+
+# Number of landmarks used when none is given
+LANDMARKS = 16
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python landmarks.py [directory] [landmarks]")
+    directory = sys.argv[1] if len(sys.argv) >= 2 else "large"
+    k = int(sys.argv[2]) if len(sys.argv) == 3 else LANDMARKS
+
+    # Load data and the landmark index, building it if needed
+    print("Loading data...")
+    degrees.load_data(directory, compact=True)
+    index = load_index(directory, degrees.graph, k)
+    print("Data loaded.")
+
+    source = degrees.person_id_for_name(input("Name: "))
+    if source is None:
+        sys.exit("Person not found.")
+    target = degrees.person_id_for_name(input("Name: "))
+    if target is None:
+        sys.exit("Person not found.")
+
+    lower, upper = index.bounds(source, target)
+    if lower == upper:
+        print(f"Landmarks: exactly {lower} degrees of separation.")
+    else:
+        print(f"Landmarks: between {lower} and {upper} degrees of separation.")
+    separation = index.degree(source, target)
+    if separation is None:
+        print("Not connected.")
+    else:
+        print(f"{separation} degrees of separation.")
+
+
+def load_index(directory, graph, k=LANDMARKS):
+    """
+    Returns the landmark index for the data in directory, reusing the
+    one saved alongside the data while the CSV files are unchanged and
+    otherwise building it with k landmarks and saving it.
+    """
+    source_stamp = snapshot.stamp(directory)
+    path = os.path.join(directory, INDEX)
+    index = LandmarkIndex.load(path, source_stamp, graph)
+    if index is None or len(index.landmarks) != min(k, len(graph.person_ids)):
+        index = LandmarkIndex.build(graph, k)
+        try:
+            index.save(path, source_stamp)
+        except OSError:
+            pass
+    return index
+
+
+class LandmarkIndex():
+    """
+    Distances from a few well-connected landmark people to everyone.
+
+    By the triangle inequality, for every landmark L,
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t),
+    which bounds the degree of separation of any pair in O(k).
+    distances holds one row of len(graph.person_ids) entries per
+    landmark, with -1 for people the landmark cannot reach.
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k=LANDMARKS):
+        """
+        Runs a breadth-first search from each of the k people with the
+        most co-star links and keeps their distance arrays.
+        """
+        landmarks = array("i", choose_landmarks(graph, k))
+        distances = array("h")
+        for landmark in landmarks:
+            distances.fromlist(graph.bfs_tree(landmark).depth.tolist())
+        return cls(graph, landmarks, distances)
+
+    @classmethod
+    def load(cls, path, source_stamp, graph):
+        """
+        Returns the index saved at path, or None if it is missing or
+        stale for source_stamp.
+        """
+        sections = snapshot.load(path, source_stamp)
+        if sections is None or set(sections) != {"landmarks", "distances"}:
+            return None
+        return cls(graph, sections["landmarks"], sections["distances"])
+
+    def save(self, path, source_stamp):
+        """
+        Writes the index to path.
+        """
+        snapshot.save(path, source_stamp, {
+            "landmarks": self.landmarks,
+            "distances": self.distances
+        })
+
+    def bounds(self, source_id, target_id):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        two person_ids. upper is math.inf if no landmark reaches both;
+        both are math.inf if the two are provably not connected.
+        """
+        n = len(self.graph.person_ids)
+        source = self.graph.person(source_id)
+        target = self.graph.person(target_id)
+        if source == target:
+            return 0, 0
+
+        distances = self.distances
+        lower = 0
+        upper = math.inf
+        for row in range(0, len(self.landmarks) * n, n):
+            to_source = distances[row + source]
+            to_target = distances[row + target]
+            if to_source < 0 and to_target < 0:
+                continue
+            if to_source < 0 or to_target < 0:
+                return math.inf, math.inf
+            lower = max(lower, abs(to_source - to_target))
+            upper = min(upper, to_source + to_target)
+        return lower, upper
+
+    def degree(self, source_id, target_id):
+        """
+        Returns the degrees of separation between two person_ids, or None
+        if they are not connected. Falls back to an exact shortest path
+        search only when the landmark bounds do not meet.
+        """
+        lower, upper = self.bounds(source_id, target_id)
+        if lower == upper:
+            return None if lower == math.inf else lower
+        path = self.graph.shortest_path(source_id, target_id)
+        return None if path is None else len(path)
+
+
+def choose_landmarks(graph, k):
+    """
+    Returns the indices of the k people with the most co-star links,
+    counting each movie's other stars once per movie.
+    """
+    offsets = graph.movie_offsets
+    links = [
+        sum(offsets[movie + 1] - offsets[movie] - 1 for movie in graph.movies_of(person))
+        for person in range(len(graph.person_ids))
+    ]
+    return sorted(range(len(links)), key=lambda person: -links[person])[:k]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import csv
+import os
+import sys
+from array import array
+from itertools import islice
+from operator import itemgetter
+
+import nameindex
+from graph import Graph, parse_year
+
+# Number of CSV rows parsed between progress reports
+CHUNK = 100000
+
+
+def load_graph(directory, progress=None):
+    """
+    Streams the CSV files in directory straight into a Graph, without
+    building the people and movies dictionaries first.
+
+    Rows are parsed in chunks of CHUNK. Names and titles are interned,
+    years go into int16 columns and star rows into two int32 columns,
+    which are then compacted into the Graph's adjacency arrays, and the
+    name index is built alongside.
+    If given, progress(filename, rows, bytes read, total bytes) is
+    called after every chunk.
+    """
+    # Load people
+    ids = []
+    person_names = []
+    person_births = array("h")
+    for rows in read_chunks(directory, "people.csv", ["id", "name", "birth"], progress):
+        for person_id, name, birth in rows:
+            ids.append(person_id)
+            person_names.append(sys.intern(name))
+            person_births.append(parse_year(birth))
+    order = sorted(range(len(ids)), key=ids.__getitem__)
+    person_ids = [ids[i] for i in order]
+    person_names = [person_names[i] for i in order]
+    person_births = array("h", [person_births[i] for i in order])
+    del ids, order
+
+    # Load movies
+    ids = []
+    movie_titles = []
+    movie_years = array("h")
+    for rows in read_chunks(directory, "movies.csv", ["id", "title", "year"], progress):
+        for movie_id, title, year in rows:
+            ids.append(movie_id)
+            movie_titles.append(sys.intern(title))
+            movie_years.append(parse_year(year))
+    order = sorted(range(len(ids)), key=ids.__getitem__)
+    movie_ids = [ids[i] for i in order]
+    movie_titles = [movie_titles[i] for i in order]
+    movie_years = array("h", [movie_years[i] for i in order])
+    del ids, order
+
+    # Load stars, skipping rows for unknown people or movies
+    person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+    movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+    star_people = array("i")
+    star_movies = array("i")
+    for rows in read_chunks(directory, "stars.csv", ["person_id", "movie_id"], progress):
+        for person_id, movie_id in rows:
+            person = person_index.get(person_id)
+            movie = movie_index.get(movie_id)
+            if person is not None and movie is not None:
+                star_people.append(person)
+                star_movies.append(movie)
+    del person_index, movie_index
+
+    person_offsets, person_movies = compress(star_people, star_movies, len(person_ids))
+    movie_offsets, movie_stars = compress(star_movies, star_people, len(movie_ids))
+    del star_people, star_movies
+
+    return Graph({
+        "person_offsets": person_offsets,
+        "person_movies": person_movies,
+        "movie_offsets": movie_offsets,
+        "movie_stars": movie_stars,
+        "person_births": person_births,
+        "movie_years": movie_years,
+        "person_ids": person_ids,
+        "person_names": person_names,
+        "movie_ids": movie_ids,
+        "movie_titles": movie_titles,
+        **nameindex.build(person_names)
+    })
+
+
+def read_chunks(directory, filename, columns, progress=None):
+    """
+    Yields the rows of a CSV file, without its header, in lists of up
+    to CHUNK rows, reporting progress after each list. Each row is a
+    tuple of the named columns, in the order given, wherever they
+    appear in the header. Blank rows are skipped and missing fields
+    are read as empty strings.
+
+    Raises ValueError if the header lacks any of the columns.
+    """
+    path = os.path.join(directory, filename)
+    total = os.path.getsize(path)
+    done = [0]
+
+    def lines(f):
+        for line in f:
+            done[0] += len(line)
+            yield line.decode("utf-8")
+
+    with open(path, "rb") as f:
+        reader = csv.reader(lines(f))
+        header = next(reader, [])
+        missing = [column for column in columns if column not in header]
+        if missing:
+            raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+        indexes = [header.index(column) for column in columns]
+        fields = itemgetter(*indexes)
+        width = max(indexes) + 1
+        rows = 0
+        while True:
+            batch = list(islice(reader, CHUNK))
+            if not batch:
+                break
+            chunk = [
+                fields(row) if len(row) >= width else fields(row + [""] * (width - len(row)))
+                for row in batch if row
+            ]
+            rows += len(chunk)
+            yield chunk
+            if progress is not None:
+                progress(filename, rows, done[0], total)
+
+
+def compress(rows, columns, n):
+    """
+    Groups (row, column) index pairs by row into compressed-sparse-row
+    offsets and values over n rows, with each row's columns sorted and
+    duplicates removed.
+    """
+    starts = array("i", [0]) * (n + 1)
+    for row in rows:
+        starts[row + 1] += 1
+    for row in range(n):
+        starts[row + 1] += starts[row]
+
+    slots = array("i", starts[:n])
+    grouped = array("i", [0]) * len(rows)
+    for row, column in zip(rows, columns):
+        grouped[slots[row]] = column
+        slots[row] += 1
+    del slots
+
+    offsets = array("i", [0])
+    values = array("i")
+    for row in range(n):
+        values.fromlist(sorted(set(grouped[starts[row]:starts[row + 1]])))
+        offsets.append(len(values))
+    return offsets, values
@@ -0,0 +1,139 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# Most trigram postings a fuzzy search counts; the query's rarest
+# trigrams are counted first, as they narrow the candidates down most
+BUDGET = 10000
+
+# Number of best-matching names rescored exactly by a fuzzy search
+SHORTLIST = 100
+
+# Least trigram similarity for a name to count as a fuzzy match
+SIMILARITY = 0.25
+
+
+def build(person_names):
+    """
+    Returns the name index columns of a Graph for a list of names:
+
+    name_order lists person indices sorted by lowercased name, and
+    name_starts[j] is the position in name_order of the first person
+    with the j-th distinct lowercased name (plus a final sentinel).
+    trigrams is the sorted list of trigrams of those names, and the
+    distinct names containing trigrams[t] are
+    trigram_names[trigram_offsets[t]:trigram_offsets[t + 1]].
+    """
+    lowered = [name.lower() for name in person_names]
+    name_order = array("i", sorted(range(len(lowered)), key=lowered.__getitem__))
+
+    name_starts = array("i")
+    postings = {}
+    previous = None
+    for position, person in enumerate(name_order):
+        name = lowered[person]
+        if name == previous:
+            continue
+        previous = name
+        for gram in trigrams(name):
+            if gram not in postings:
+                postings[gram] = array("i")
+            postings[gram].append(len(name_starts))
+        name_starts.append(position)
+    name_starts.append(len(name_order))
+
+    grams = sorted(postings)
+    trigram_offsets = array("i", [0])
+    trigram_names = array("i")
+    for gram in grams:
+        trigram_names.extend(postings.pop(gram))
+        trigram_offsets.append(len(trigram_names))
+
+    return {
+        "name_order": name_order,
+        "name_starts": name_starts,
+        "trigrams": grams,
+        "trigram_offsets": trigram_offsets,
+        "trigram_names": trigram_names
+    }
+
+
+def trigrams(name):
+    """
+    Returns the set of three-character substrings of a lowercased name,
+    padded so that its first and last letters form trigrams of their own.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def suggest(graph, text, k=10):
+    """
+    Returns up to k person indices whose names best match text: exact
+    matches first, then names starting with text, then names sharing
+    the most trigrams with it.
+    """
+    text = text.lower().strip()
+    people = list(graph.people_named(text))
+    seen = set(people)
+    for finder in (prefix, fuzzy):
+        if len(people) >= k:
+            break
+        for person in finder(graph, text, k):
+            if person not in seen:
+                seen.add(person)
+                people.append(person)
+    return people[:k]
+
+
+def prefix(graph, text, k=10):
+    """
+    Returns up to k person indices whose lowercased names start with
+    text, in name order.
+    """
+    start = bisect_left(graph.name_order, text, key=graph.person_key)
+    people = []
+    for person in graph.name_order[start:start + k]:
+        if not graph.person_key(person).startswith(text):
+            break
+        people.append(person)
+    return people
+
+
+def fuzzy(graph, text, k=10):
+    """
+    Returns up to k person indices whose lowercased names are most
+    similar to text, by the Jaccard similarity of their trigram sets,
+    leaving out names less similar than SIMILARITY.
+    """
+    grams = trigrams(text)
+    lists = []
+    for gram in grams:
+        t = bisect_left(graph.trigrams, gram)
+        if t < len(graph.trigrams) and graph.trigrams[t] == gram:
+            lists.append(graph.trigram_names[graph.trigram_offsets[t]:graph.trigram_offsets[t + 1]])
+
+    shared = Counter()
+    counted = 0
+    for names in sorted(lists, key=len):
+        if counted and counted + len(names) > BUDGET:
+            break
+        shared.update(names)
+        counted += len(names)
+
+    scored = []
+    for name, _ in shared.most_common(SHORTLIST):
+        person = graph.name_order[graph.name_starts[name]]
+        other = trigrams(graph.person_key(person))
+        overlap = len(grams & other)
+        similarity = overlap / (len(grams) + len(other) - overlap)
+        if similarity >= SIMILARITY:
+            scored.append((similarity, name))
+    scored.sort(key=lambda entry: -entry[0])
+
+    people = []
+    for _, name in scored:
+        people.extend(graph.name_order[graph.name_starts[name]:graph.name_starts[name + 1]])
+        if len(people) >= k:
+            break
+    return people[:k]
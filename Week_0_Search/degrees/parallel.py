@@ -0,0 +1,85 @@
+import multiprocessing
+import time
+
+import degrees
+
+
+def solve_groups(groups, workers, directory=None):
+    """
+    Answers each (source_id, target_ids) pair in groups with
+    solve_group, spread across a pool of worker processes.
+
+    Yields (source_id, paths, latencies, cached) as each group
+    completes, which may be out of order. Where fork is available,
+    workers inherit the loaded graph copy-on-write; otherwise each worker
+    maps the graph snapshot for directory, which the operating system
+    shares between them, so the graph itself is never pickled. If the
+    tree cache is enabled, each worker keeps a cache of the same size.
+    """
+    groups = list(groups)
+    if workers <= 1 or len(groups) <= 1:
+        for source_id, target_ids in groups:
+            yield (source_id, *solve_group(source_id, target_ids))
+        return
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        initializer, initargs = None, ()
+    else:
+        context = multiprocessing.get_context("spawn")
+        max_bytes = degrees.cache.max_bytes if degrees.cache is not None else None
+        initializer, initargs = setup, (directory, max_bytes)
+
+    # Small chunks keep workers busy when group sizes are uneven
+    chunksize = max(1, len(groups) // (workers * 8))
+    with context.Pool(workers, initializer, initargs) as pool:
+        yield from pool.imap_unordered(solve_source, groups, chunksize)
+
+
+def solve_group(source_id, target_ids):
+    """
+    Answers the query from source_id to each of target_ids with one
+    breadth-first tree grown from source_id, or taken from the tree
+    cache if one is enabled.
+
+    Returns the list of paths, the list of per-query latencies, in
+    seconds, with the cost of growing the tree shared evenly by the group,
+    and whether the tree was a cache hit (None if there is no cache).
+    """
+    graph = degrees.graph
+    start = time.perf_counter()
+    source = graph.person(source_id)
+    targets = [graph.person(target_id) for target_id in target_ids]
+    if degrees.cache is not None:
+        cached = source_id in degrees.cache.trees
+        tree = degrees.cache.tree(source_id)
+    else:
+        cached = None
+        tree = graph.bfs_tree(source, targets)
+    shared = (time.perf_counter() - start) / len(targets)
+
+    paths = []
+    latencies = []
+    for target in targets:
+        start = time.perf_counter()
+        paths.append(graph.tree_path(tree, target))
+        latencies.append(shared + time.perf_counter() - start)
+    return paths, latencies, cached
+
+
+def setup(directory, max_bytes):
+    """
+    Worker initializer where the graph is not inherited: maps the graph
+    snapshot and enables a tree cache of max_bytes if one is given.
+    """
+    degrees.load_data(directory, True)
+    if max_bytes is not None:
+        degrees.enable_cache(max_bytes)
+
+
+def solve_source(group):
+    """
+    Worker entry point: answers one (source_id, target_ids) group.
+    """
+    source_id, target_ids = group
+    return (source_id, *solve_group(source_id, target_ids))
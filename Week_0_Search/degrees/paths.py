@@ -0,0 +1,256 @@
+import argparse
+import heapq
+import sys
+from array import array
+from itertools import islice
+
+import degrees
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List shortest paths between two people.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("-k", type=int, default=None,
+                        help="list the k shortest paths (default: every shortest path)")
+    parser.add_argument("--from-year", type=int, default=None,
+                        help="only use movies released in or after this year")
+    parser.add_argument("--to-year", type=int, default=None,
+                        help="only use movies released in or before this year")
+    args = parser.parse_args()
+
+    # Load data from files into memory
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=True)
+    print("Data loaded.")
+
+    source = degrees.person_id_for_name(input("Name: "))
+    if source is None:
+        sys.exit("Person not found.")
+    target = degrees.person_id_for_name(input("Name: "))
+    if target is None:
+        sys.exit("Person not found.")
+
+    graph = degrees.graph
+    if args.k is None:
+        paths = all_shortest_paths(graph, source, target, args.from_year, args.to_year)
+    else:
+        paths = k_shortest_paths(graph, source, target, args.k, args.from_year, args.to_year)
+
+    count = 0
+    for count, path in enumerate(paths, 1):
+        steps = " -> ".join(
+            f"{degrees.people[person_id]['name']} ({degrees.movies[movie_id]['title']})"
+            for movie_id, person_id in path
+        )
+        print(f"{count}: {degrees.people[source]['name']} -> {steps}"
+              if path else f"{count}: {degrees.people[source]['name']}")
+    if not count:
+        print("Not connected.")
+
+
+def all_shortest_paths(graph, source_id, target_id, min_year=None, max_year=None):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that
+    connects the source to the target, optionally only through movies
+    released between min_year and max_year inclusive.
+
+    The shortest-path DAG is built once with two breadth-first passes;
+    paths are then enumerated from it depth-first, so memory stays
+    proportional to the DAG however many paths there are.
+    """
+    source = graph.person(source_id)
+    target = graph.person(target_id)
+    allowed = movie_filter(graph, min_year, max_year)
+    if source == target:
+        yield []
+        return
+    dag = shortest_path_dag(graph, source, target, allowed)
+    if dag is None:
+        return
+
+    # Walk predecessor lists back from the target, one iterator per step
+    stack = [iter(dag[target])]
+    steps = [(None, target)]
+    while stack:
+        step = next(stack[-1], None)
+        if step is None:
+            stack.pop()
+            steps.pop()
+            continue
+        movie, predecessor = step
+        steps[-1] = (movie, steps[-1][1])
+        if predecessor == source:
+            yield [
+                (graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in reversed(steps)
+            ]
+        else:
+            stack.append(iter(dag[predecessor]))
+            steps.append((None, predecessor))
+
+
+def shortest_path_dag(graph, source, target, allowed=None):
+    """
+    Returns the DAG of all shortest paths from source to target (person
+    indices) as a dict mapping each person on such a path, other than the
+    source, to a list of (movie, predecessor) index pairs. Returns None
+    if the target cannot be reached.
+
+    A forward breadth-first pass labels people with their distance from
+    the source until the target's layer is complete; a backward pass
+    from the target then keeps only edges that step one layer closer.
+    """
+    depth = array("i", [-1]) * len(graph.person_ids)
+    depth[source] = 0
+    layer = [source]
+    while layer and depth[target] < 0:
+        next_layer = []
+        for person in layer:
+            d = depth[person] + 1
+            for movie in graph.movies_of(person):
+                if allowed is not None and not allowed(movie):
+                    continue
+                for star in graph.stars_of(movie):
+                    if depth[star] < 0:
+                        depth[star] = d
+                        next_layer.append(star)
+        layer = next_layer
+    if depth[target] < 0:
+        return None
+
+    dag = {}
+    queued = {target}
+    layer = [target]
+    while layer:
+        next_layer = []
+        for person in layer:
+            d = depth[person] - 1
+            if d < 0:
+                continue
+            predecessors = []
+            for movie in graph.movies_of(person):
+                if allowed is not None and not allowed(movie):
+                    continue
+                for star in graph.stars_of(movie):
+                    if depth[star] == d:
+                        predecessors.append((movie, star))
+                        if star not in queued:
+                            queued.add(star)
+                            next_layer.append(star)
+            dag[person] = predecessors
+        layer = next_layer
+    return dag
+
+
+def k_shortest_paths(graph, source_id, target_id, k, min_year=None, max_year=None):
+    """
+    Yields up to k loopless lists of (movie_id, person_id) pairs from the
+    source to the target in order of length, optionally only through
+    movies released between min_year and max_year inclusive.
+
+    Every shortest path comes straight from the shortest-path DAG; only
+    if there are fewer than k of those are longer paths found, with
+    Yen's algorithm seeded with the shortest ones.
+    """
+    if k <= 0:
+        return
+    source = graph.person(source_id)
+    target = graph.person(target_id)
+    allowed = movie_filter(graph, min_year, max_year)
+
+    accepted = []
+    for path in islice(all_shortest_paths(graph, source_id, target_id, min_year, max_year), k):
+        accepted.append(index_path(graph, source, path))
+        yield path
+    if not accepted or len(accepted) == k or source == target:
+        return
+
+    candidates = []
+    seen = set(accepted)
+    spurred = 0
+    while len(accepted) < k:
+        for people, movies in accepted[spurred:]:
+            for i in range(len(movies)):
+                root = (people[:i + 1], movies[:i])
+                blocked_edges = {
+                    (other_movies[i], other_people[i + 1])
+                    for other_people, other_movies in accepted
+                    if len(other_movies) > i and (other_people[:i + 1], other_movies[:i]) == root
+                }
+                spur = restricted_path(graph, people[i], target, set(people[:i]),
+                                       blocked_edges, allowed)
+                if spur is None:
+                    continue
+                candidate = (people[:i] + spur[0], movies[:i] + spur[1])
+                if candidate not in seen:
+                    seen.add(candidate)
+                    heapq.heappush(candidates, (len(candidate[1]), candidate))
+        spurred = len(accepted)
+        if not candidates:
+            return
+        _, (people, movies) = heapq.heappop(candidates)
+        accepted.append((people, movies))
+        yield [(graph.movie_ids[movie], graph.person_ids[person])
+               for movie, person in zip(movies, people[1:])]
+
+
+def restricted_path(graph, source, target, blocked_people, blocked_edges, allowed=None):
+    """
+    Returns the people and movies (as index tuples) of a shortest path
+    from source to target that avoids blocked_people and does not leave
+    the source by any (movie, person) in blocked_edges, or None.
+    """
+    parents = {source: None}
+    layer = [source]
+    while layer and target not in parents:
+        next_layer = []
+        for person in layer:
+            for movie in graph.movies_of(person):
+                if allowed is not None and not allowed(movie):
+                    continue
+                for star in graph.stars_of(movie):
+                    if star in parents or star in blocked_people:
+                        continue
+                    if person == source and (movie, star) in blocked_edges:
+                        continue
+                    parents[star] = (movie, person)
+                    next_layer.append(star)
+        layer = next_layer
+    if target not in parents:
+        return None
+
+    people = [target]
+    movies = []
+    while parents[people[-1]] is not None:
+        movie, person = parents[people[-1]]
+        movies.append(movie)
+        people.append(person)
+    return tuple(reversed(people)), tuple(reversed(movies))
+
+
+def index_path(graph, source, path):
+    """
+    Returns the people and movies (as index tuples) of a path given as
+    (movie_id, person_id) pairs starting from a source index.
+    """
+    people = (source,) + tuple(graph.person(person_id) for _, person_id in path)
+    movies = tuple(graph.movie(movie_id) for movie_id, _ in path)
+    return people, movies
+
+
+def movie_filter(graph, min_year=None, max_year=None):
+    """
+    Returns a function telling whether a movie index was released between
+    min_year and max_year inclusive, or None if neither is given.
+    Movies with an unknown year are left out whenever a bound is given.
+    """
+    if min_year is None and max_year is None:
+        return None
+    low = min_year if min_year is not None else 1
+    high = max_year if max_year is not None else 32767
+    years = graph.movie_years
+    return lambda movie: low <= years[movie] <= high
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+# Bump whenever the layout of a snapshot or of its sections changes
+VERSION = 3
+
+MAGIC = b"DEGSNAP\0"
+HEADER = struct.Struct("<8sI")
+ALIGNMENT = 8
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+
+def stamp(directory):
+    """
+    Returns the size and modification time of each CSV file in a data
+    directory, so that a snapshot can tell whether it is out of date.
+    """
+    result = {}
+    for filename in SOURCES:
+        stat = os.stat(os.path.join(directory, filename))
+        result[filename] = [stat.st_size, stat.st_mtime_ns]
+    return result
+
+
+def save(path, source_stamp, sections):
+    """
+    Writes a snapshot file.
+
+    sections maps each section name to either an integer array or a
+    list of strings. Arrays are written raw so that load can map them
+    back without copying; string lists are written as one NUL-separated
+    UTF-8 string table.
+    """
+    blobs = []
+    layout = {}
+    offset = 0
+    for name, values in sections.items():
+        if isinstance(values, array):
+            kind = values.typecode
+            blob = values.tobytes()
+        elif isinstance(values, memoryview):
+            kind = values.format
+            blob = values.tobytes()
+        else:
+            kind = "s"
+            blob = "\0".join(values).encode("utf-8")
+        padding = -offset % ALIGNMENT
+        offset += padding
+        layout[name] = [kind, offset, len(blob), len(values)]
+        blobs.append(b"\0" * padding + blob)
+        offset += len(blob)
+
+    header = json.dumps({
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "itemsize": array("i").itemsize,
+        "stamp": source_stamp,
+        "sections": layout
+    }).encode("utf-8")
+    header += b" " * (-(HEADER.size + len(header)) % ALIGNMENT)
+
+    # Write to a temporary file first so a crash never leaves a torn snapshot
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(temporary, path)
+
+
+def load(path, source_stamp):
+    """
+    Reads a snapshot file written by save.
+
+    Returns a dict mapping each section name to a memory-mapped integer
+    view or a list of strings, or None if the snapshot is missing,
+    was written by another version, or is stale for source_stamp.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        prefix = f.read(HEADER.size)
+        if len(prefix) != HEADER.size:
+            return None
+        magic, length = HEADER.unpack(prefix)
+        if magic != MAGIC:
+            return None
+        try:
+            header = json.loads(f.read(length))
+        except ValueError:
+            return None
+        if (header.get("version") != VERSION
+                or header.get("byteorder") != sys.byteorder
+                or header.get("itemsize") != array("i").itemsize
+                or header.get("stamp") != source_stamp):
+            return None
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    base = HEADER.size + length
+    view = memoryview(data)
+    sections = {}
+    for name, (kind, offset, size, count) in header["sections"].items():
+        blob = view[base + offset:base + offset + size]
+        if kind != "s":
+            sections[name] = blob.cast(kind)
+        elif count:
+            sections[name] = str(blob, "utf-8").split("\0")
+        else:
+            sections[name] = []
+    return sections
@@ -0,0 +1,150 @@
+import argparse
+import multiprocessing
+import random
+import sys
+from array import array
+from collections import Counter
+
+import degrees
+import snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute degree statistics over a dataset.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("output", nargs="?", default="stats.columns",
+                        help="columnar file to write results to")
+    parser.add_argument("--source", default=None,
+                        help="name or person ID to measure separation from")
+    parser.add_argument("--samples", type=int, default=100,
+                        help="number of people to sample eccentricities for")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of worker processes (default: 1)")
+    args = parser.parse_args()
+
+    # Load data from files into memory
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=True)
+    print("Data loaded.")
+    graph = degrees.graph
+    columns = {}
+
+    # Connected components
+    component = components(graph)
+    sizes = Counter(component)
+    columns["component"] = component
+    columns["component_sizes"] = array("i", [sizes[label] for label in range(len(sizes))])
+    print(f"{len(sizes)} connected components; largest has "
+          f"{max(sizes.values(), default=0)} of {len(component)} people.")
+
+    # Separation from one person to everyone
+    if args.source is not None:
+        if args.source in degrees.people:
+            source_id = args.source
+        else:
+            source_id = degrees.person_id_for_name(args.source)
+        if source_id is None:
+            sys.exit("Person not found.")
+        distances = graph.bfs_tree(graph.person(source_id)).depth
+        columns["distance"] = distances
+        reached, mean, eccentricity = summarize(distances)
+        print(f"{graph.person_names[graph.person(source_id)]} reaches {reached - 1} people, "
+              f"at an average separation of {mean:.3f} and at most {eccentricity}.")
+
+    # Sampled eccentricities
+    rng = random.Random(args.seed)
+    sample = rng.sample(range(len(graph.person_ids)), min(args.samples, len(graph.person_ids)))
+    results = sorted(eccentricities(sample, args.workers))
+    columns["sample"] = array("i", [person for person, _, _, _ in results])
+    columns["sample_reached"] = array("i", [reached for _, reached, _, _ in results])
+    columns["sample_mean"] = array("d", [mean for _, _, mean, _ in results])
+    columns["sample_eccentricity"] = array("i", [eccentricity for _, _, _, eccentricity in results])
+    if results:
+        largest = max(eccentricity for _, _, _, eccentricity in results)
+        print(f"Sampled {len(results)} people: eccentricities range up to {largest}, "
+              f"so the diameter is at least {largest}.")
+
+    snapshot.save(args.output, snapshot.stamp(args.directory), columns)
+    print(f"Results written to {args.output}.")
+
+
+def components(graph):
+    """
+    Returns an int32 array labelling each person index with its
+    connected component, numbered by order of first appearance.
+
+    Uses union-find over the stars of each movie, with path halving
+    and union by size.
+    """
+    n = len(graph.person_ids)
+    parent = array("i", range(n))
+    size = array("i", [1]) * n
+
+    def find(person):
+        while parent[person] != person:
+            parent[person] = parent[parent[person]]
+            person = parent[person]
+        return person
+
+    for movie in range(len(graph.movie_ids)):
+        stars = graph.stars_of(movie)
+        if len(stars) < 2:
+            continue
+        root = find(stars[0])
+        for star in stars[1:]:
+            other = find(star)
+            if other == root:
+                continue
+            if size[other] > size[root]:
+                root, other = other, root
+            parent[other] = root
+            size[root] += size[other]
+
+    labels = {}
+    component = array("i", [0]) * n
+    for person in range(n):
+        component[person] = labels.setdefault(find(person), len(labels))
+    return component
+
+
+def summarize(distances):
+    """
+    Returns how many people a distance array reaches (including its
+    source), their mean distance from it, and the largest distance.
+    """
+    reached = 0
+    total = 0
+    eccentricity = 0
+    for distance in distances:
+        if distance >= 0:
+            reached += 1
+            total += distance
+            if distance > eccentricity:
+                eccentricity = distance
+    return reached, total / max(reached - 1, 1), eccentricity
+
+
+def eccentricities(sample, workers=1):
+    """
+    Returns (person, reached, mean distance, eccentricity) for each
+    person index in sample, with the breadth-first searches spread
+    across worker processes if more than one. Workers inherit the
+    loaded graph through fork and only send back the summaries.
+    """
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return [measure(person) for person in sample]
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers) as pool:
+        return pool.map(measure, sample, max(1, len(sample) // (workers * 4)))
+
+
+def measure(person):
+    """
+    Worker entry point: summarizes the distances from one person index.
+    """
+    return (person, *summarize(degrees.graph.bfs_tree(person).depth))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+from collections import Counter, deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +39,41 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    """
+    Stack frontier with constant-time add and remove, and a
+    hashed count of the states it holds for contains_state.
+    """
+    def __init__(self):
+        self.frontier = deque()
+        self.states = Counter()
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] += 1
+
+    def contains_state(self, state):
+        return self.states[state] > 0
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def pop(self):
+        return self.frontier.pop()
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.pop()
+        self.states[node.state] -= 1
+        if not self.states[node.state]:
+            del self.states[node.state]
+        return node
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def pop(self):
+        return self.frontier.popleft()
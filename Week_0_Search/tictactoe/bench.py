@@ -0,0 +1,143 @@
+"""
+Headless self-play benchmark for the Tic Tac Toe AI
+"""
+
+import argparse
+import multiprocessing
+import random
+import time
+
+import engine
+import tictactoe as ttt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play Tic Tac Toe games without a window and time the AI.")
+    parser.add_argument("games", nargs="?", type=int, default=100,
+                        help="number of games per opponent (default: 100)")
+    parser.add_argument("--opponent", choices=["ai", "random", "both"], default="both",
+                        help="play the AI against itself, a random player, or both")
+    parser.add_argument("--board", type=int, nargs=3, default=[3, 3, 3], metavar=("ROWS", "COLUMNS", "K"),
+                        help="board size and win length (default: 3 3 3)")
+    parser.add_argument("--search", choices=sorted(engine.SEARCHES), default=None,
+                        help="search to use (default: minimax's own choice)")
+    parser.add_argument("--book", action="store_true",
+                        help="answer from the opening book where there is one")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="seconds per move for the deepening search")
+    parser.add_argument("--random-opening", type=int, default=0, metavar="PLIES",
+                        help="play this many random moves first, so AI games differ")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of worker processes (default: 1)")
+    args = parser.parse_args()
+
+    opponents = ["ai", "random"] if args.opponent == "both" else [args.opponent]
+    settings = (tuple(args.board), args.book)
+    for opponent in opponents:
+        games = [
+            (opponent, args.seed + number, args.search, args.budget, args.random_opening)
+            for number in range(args.games)
+        ]
+        start = time.perf_counter()
+        results = play_all(games, settings, args.workers)
+        report(opponent, results, time.perf_counter() - start)
+
+
+def play_all(games, settings, workers=1):
+    """
+    Plays every game, spread across workers processes if more than one,
+    and returns their results in order. Each worker sets up the board
+    (and opening book) given by settings before playing.
+    """
+    if workers <= 1:
+        setup(*settings)
+        return [play(*game) for game in games]
+    with multiprocessing.Pool(workers, setup, settings) as pool:
+        return pool.starmap(play, games, max(1, len(games) // (workers * 4)))
+
+
+def setup(board, book):
+    """
+    Worker initializer: configures the board and loads the book if asked.
+    """
+    ttt.configure(*board)
+    ttt.book = None
+    if book:
+        ttt.use_book()
+
+
+def play(opponent, seed, search=None, budget=None, random_opening=0):
+    """
+    Plays one game of the AI against opponent ("ai" or "random"). Against
+    a random player the AI plays X in even-numbered seeds and O otherwise.
+
+    Returns a dict of the winner, the AI's mark (None if it plays both),
+    the seconds each AI move took and the positions it searched.
+    """
+    rng = random.Random(seed)
+    ai = None if opponent == "ai" else (ttt.X if seed % 2 == 0 else ttt.O)
+    engine.clear()
+    board = ttt.initial_state()
+    latencies = []
+    stats = engine.SearchStats()
+    plies = 0
+    while not ttt.terminal(board):
+        if plies < random_opening or (ai is not None and ttt.player(board) != ai):
+            move = rng.choice(sorted(ttt.actions(board)))
+        else:
+            start = time.perf_counter()
+            move = ttt.minimax(board, search, stats, budget)
+            latencies.append(time.perf_counter() - start)
+        board = ttt.result(board, move)
+        plies += 1
+    return {
+        "winner": ttt.winner(board),
+        "ai": ai,
+        "latencies": latencies,
+        "nodes": stats.nodes
+    }
+
+
+def report(opponent, results, seconds):
+    """
+    Prints outcome rates, search speed and move latency percentiles.
+    """
+    count = len(results)
+    print(f"AI vs {opponent}: {count} games in {seconds:.3f}s")
+    if not count:
+        return
+
+    if opponent == "ai":
+        outcomes = {"X wins": 0, "O wins": 0, "draws": 0}
+        for result in results:
+            if result["winner"] is None:
+                outcomes["draws"] += 1
+            else:
+                outcomes[f"{result['winner']} wins"] += 1
+    else:
+        outcomes = {"AI wins": 0, "AI losses": 0, "draws": 0}
+        for result in results:
+            if result["winner"] is None:
+                outcomes["draws"] += 1
+            elif result["winner"] == result["ai"]:
+                outcomes["AI wins"] += 1
+            else:
+                outcomes["AI losses"] += 1
+    print("  " + ", ".join(f"{name}: {100 * n / count:.1f}%" for name, n in outcomes.items()))
+
+    latencies = sorted(latency for result in results for latency in result["latencies"])
+    nodes = sum(result["nodes"] for result in results)
+    searching = sum(latencies)
+    print(f"  {len(latencies)} AI moves, {nodes} nodes searched "
+          f"({nodes / searching if searching else 0:.0f} nodes/s)")
+    if latencies:
+        moves = len(latencies)
+        print("  latency " + ", ".join(
+            f"p{percentile}: {latencies[min(moves - 1, moves * percentile // 100)] * 1000:.3f}ms"
+            for percentile in (50, 90, 99)
+        ) + f", max: {latencies[-1] * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
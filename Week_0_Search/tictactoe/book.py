@@ -0,0 +1,159 @@
+"""
+Perfect-play opening book for Tic Tac Toe
+
+Run "python book.py" to solve every reachable position and write BOOK.
+"""
+
+import os
+import sys
+
+import engine
+
+# File the book is written to and read from, next to this module
+BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Byte stored for positions with no move to make
+NO_MOVE = 255
+
+# Largest board the book covers, as 3 ** CELLS bytes are stored
+MAX_CELLS = 9
+
+
+class Book():
+    """
+    Best move for every position of a board, one byte per position,
+    indexed by the position read as a base-3 number with a digit per
+    cell: 0 for empty, 1 for X and 2 for O.
+    """
+
+    def __init__(self, shape, moves):
+        self.shape = shape
+        self.moves = moves
+        self.tables = ternary_table(shape[0] * shape[1])
+
+    @classmethod
+    def build(cls):
+        """
+        Returns the book for the engine's current board, solving every
+        position reachable from the empty board.
+        """
+        if engine.CELLS > MAX_CELLS:
+            raise ValueError(f"boards of more than {MAX_CELLS} cells are too large for a book")
+        book = cls((engine.ROWS, engine.COLUMNS, engine.K), bytearray([NO_MOVE]) * 3 ** engine.CELLS)
+        seen = set()
+        stack = [(0, 0)]
+        while stack:
+            x, o = stack.pop()
+            if (x, o) in seen:
+                continue
+            seen.add((x, o))
+            move = engine.best_move(x, o)
+            if move is None:
+                continue
+            book.moves[book.index(x, o)] = move
+            x_turn = x.bit_count() == o.bit_count()
+            free = engine.FULL & ~(x | o)
+            for i in range(engine.CELLS):
+                if free >> i & 1:
+                    stack.append((x | 1 << i, o) if x_turn else (x, o | 1 << i))
+        return book
+
+    @classmethod
+    def load(cls, path=BOOK):
+        """
+        Returns the book stored at path: three bytes giving the rows,
+        columns and win length, then one byte per position.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        shape = tuple(data[:3])
+        if len(shape) != 3 or len(data) != 3 + 3 ** (shape[0] * shape[1]):
+            raise ValueError(f"{path} is not an opening book")
+        return cls(shape, data[3:])
+
+    def save(self, path=BOOK):
+        """
+        Writes the book to path.
+        """
+        with open(path, "wb") as f:
+            f.write(bytes(self.shape))
+            f.write(self.moves)
+
+    def index(self, x, o):
+        """
+        Returns the position index of (X, O) bitmasks.
+        """
+        return ternary(self.tables, x) + 2 * ternary(self.tables, o)
+
+    def move(self, x, o):
+        """
+        Returns the cell index of the best move for the player to move,
+        or None if the game is over or the book is for another board.
+        """
+        if self.shape != (engine.ROWS, engine.COLUMNS, engine.K):
+            return None
+        move = self.moves[self.index(x, o)]
+        return None if move == NO_MOVE else move
+
+
+def ternary_table(cells):
+    """
+    Returns, for each group of up to 8 cells, a 256-entry table giving the
+    base-3 value of each bitmask over those cells.
+    """
+    tables = []
+    for start in range(0, cells, 8):
+        table = [0] * 256
+        for bits in range(1, 256):
+            low = bits & -bits
+            i = start + low.bit_length() - 1
+            table[bits] = table[bits ^ low] + (3 ** i if i < cells else 0)
+        tables.append(table)
+    return tables
+
+
+def ternary(tables, bits):
+    """
+    Returns the base-3 value of a bitmask, with a 1 digit per set bit.
+    """
+    result = 0
+    for table in tables:
+        result += table[bits & 255]
+        bits >>= 8
+    return result
+
+
+def load(path=BOOK):
+    """
+    Returns the book at path for the engine's current board. If the file
+    is missing or unreadable, the book is built and saved there first;
+    if it is for another board, a book is built but not saved.
+    """
+    try:
+        book = Book.load(path)
+    except (OSError, ValueError):
+        book = None
+    if book is not None and book.shape == (engine.ROWS, engine.COLUMNS, engine.K):
+        return book
+    missing = book is None
+    book = Book.build()
+    if missing:
+        try:
+            book.save(path)
+        except OSError:
+            pass
+    return book
+
+
+def main():
+    if len(sys.argv) not in [1, 2]:
+        sys.exit("Usage: python book.py [book]")
+    path = sys.argv[1] if len(sys.argv) == 2 else BOOK
+    book = Book.build()
+    book.save(path)
+    solved = sum(move != NO_MOVE for move in book.moves)
+    print(f"Solved {solved} positions; book written to {path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,560 @@
+"""
+Bitboard search engine for m,n,k games such as Tic Tac Toe
+"""
+
+import time
+
+# Default seconds per move for the iterative deepening search
+TIME_BUDGET = 1.0
+
+# Score of a win at the root; wins further away score one less per ply
+WIN = 1000000
+
+
+def configure(rows, columns, k):
+    """
+    Sets the board to rows by columns cells, won by k in a row,
+    and clears every cached result.
+    """
+    global ROWS, COLUMNS, K, CELLS, FULL, ORDER, LINES, CELL_LINES, SYMMETRIES
+    if not 1 <= k <= max(rows, columns):
+        raise ValueError("k must fit on the board")
+    ROWS, COLUMNS, K = rows, columns, k
+    CELLS = rows * columns
+    FULL = (1 << CELLS) - 1
+    LINES = winning_lines()
+    CELL_LINES = [[line for line in LINES if line >> i & 1] for i in range(CELLS)]
+    ORDER = center_first()
+    SYMMETRIES = symmetry_tables()
+    table.clear()
+    clear()
+
+
+def clear():
+    """
+    Forgets the iterative deepening search's positions, which only
+    help within one game. The exact table stays, as it is bounded by
+    the positions of the board.
+    """
+    deep_table.clear()
+
+
+def cell(row, column):
+    """
+    Returns the bit index of a board cell.
+    """
+    return row * COLUMNS + column
+
+
+def center_first():
+    """
+    Returns every cell index, those on the most winning lines first and
+    then nearest the center: center, corners and edges on 3x3.
+    """
+    return sorted(
+        range(CELLS),
+        key=lambda i: (
+            -len(CELL_LINES[i]),
+            abs(2 * (i // COLUMNS) - (ROWS - 1)) + abs(2 * (i % COLUMNS) - (COLUMNS - 1))
+        )
+    )
+
+
+def winning_lines():
+    """
+    Returns the bitmask of every run of K cells along a row,
+    column or diagonal.
+    """
+    lines = []
+    for i in range(ROWS):
+        for j in range(COLUMNS):
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_i, end_j = i + di * (K - 1), j + dj * (K - 1)
+                if 0 <= end_i < ROWS and 0 <= end_j < COLUMNS:
+                    lines.append(sum(1 << cell(i + di * n, j + dj * n) for n in range(K)))
+    return lines
+
+
+def symmetry_tables():
+    """
+    Returns, for each rotation and reflection that maps the board onto
+    itself (8 for square boards, 4 otherwise), a list of 256-entry
+    tables that transform a bitmask one byte at a time.
+    """
+    maps = []
+    for transpose in ((False, True) if ROWS == COLUMNS else (False,)):
+        for flip_rows in (False, True):
+            for flip_columns in (False, True):
+                mapping = []
+                for i in range(ROWS):
+                    for j in range(COLUMNS):
+                        r, c = (j, i) if transpose else (i, j)
+                        r = ROWS - 1 - r if flip_rows else r
+                        c = COLUMNS - 1 - c if flip_columns else c
+                        mapping.append(cell(r, c))
+                maps.append(mapping)
+
+    tables = []
+    for mapping in maps:
+        chunks = []
+        for start in range(0, CELLS, 8):
+            chunk = [0] * 256
+            for bits in range(1, 256):
+                low = bits & -bits
+                i = start + low.bit_length() - 1
+                chunk[bits] = chunk[bits ^ low] | (1 << mapping[i] if i < CELLS else 0)
+            chunks.append(chunk)
+        tables.append(chunks)
+    return tables
+
+
+# Transposition table of the exact search: canonical key -> game value for X
+table = {}
+
+# Transposition table of the iterative deepening search:
+# (mover's bits, opponent's bits) -> (depth, score, bound, best move)
+deep_table = {}
+
+configure(3, 3, 3)
+
+
+def encode(board):
+    """
+    Returns the (X, O) bitmasks of a list-of-lists board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, mark in enumerate(row):
+            if mark == "X":
+                x |= 1 << cell(i, j)
+            elif mark == "O":
+                o |= 1 << cell(i, j)
+    return x, o
+
+
+def transform(chunks, bits):
+    """
+    Returns a bitmask transformed by one symmetry's byte tables.
+    """
+    result = 0
+    for chunk in chunks:
+        result |= chunk[bits & 255]
+        bits >>= 8
+    return result
+
+
+def canonical(x, o):
+    """
+    Returns one key shared by a position and all its symmetric images.
+    """
+    return min((transform(t, x) << CELLS) | transform(t, o) for t in SYMMETRIES)
+
+
+def won(bits):
+    """
+    Returns True if a player's bitmask contains a complete line.
+    """
+    for line in LINES:
+        if bits & line == line:
+            return True
+    return False
+
+
+def won_through(bits, i):
+    """
+    Returns True if a player's bitmask contains a complete line through
+    cell i, which is all that can change after a move there.
+    """
+    for line in CELL_LINES[i]:
+        if bits & line == line:
+            return True
+    return False
+
+
+def value(x, o, stats=None):
+    """
+    Returns 1 if X wins with perfect play from this position,
+    -1 if O wins, 0 otherwise. Results are memoized by canonical key;
+    if given, stats counts the positions solved rather than looked up.
+    """
+    key = canonical(x, o)
+    if key in table:
+        return table[key]
+    if stats is not None:
+        stats.nodes += 1
+
+    if won(x):
+        result = 1
+    elif won(o):
+        result = -1
+    elif x | o == FULL:
+        result = 0
+    else:
+        x_turn = x.bit_count() == o.bit_count()
+        target = 1 if x_turn else -1
+        result = -target
+        free = FULL & ~(x | o)
+        for i in ORDER:
+            bit = 1 << i
+            if not free & bit:
+                continue
+            child = value(x | bit, o, stats) if x_turn else value(x, o | bit, stats)
+            if child == target:
+                result = child
+                break
+            if child == 0:
+                result = 0
+    table[key] = result
+    return result
+
+
+def best_move(x, o, stats=None):
+    """
+    Returns the cell index of an optimal move for the player to move,
+    or None if the game is over.
+    """
+    if won(x) or won(o) or x | o == FULL:
+        return None
+    x_turn = x.bit_count() == o.bit_count()
+    best = None
+    best_value = None
+    free = FULL & ~(x | o)
+    for i in ORDER:
+        bit = 1 << i
+        if not free & bit:
+            continue
+        child = value(x | bit, o, stats) if x_turn else value(x, o | bit, stats)
+        if not x_turn:
+            child = -child
+        if best is None or child > best_value:
+            best, best_value = i, child
+            if child == 1:
+                break
+    return best
+
+
+class SearchStats():
+    """
+    Counts the positions a search visits.
+    """
+    def __init__(self):
+        self.nodes = 0
+
+
+def outcome(x, o):
+    """
+    Returns 1 if X has won, -1 if O has won, 0 for a draw,
+    or None if the game is not over.
+    """
+    if won(x):
+        return 1
+    if won(o):
+        return -1
+    if x | o == FULL:
+        return 0
+    return None
+
+
+def plain_value(x, o, stats):
+    """
+    Returns the game value for X by searching every line of play,
+    without pruning or memoization. Used as a reference for node counts.
+    """
+    stats.nodes += 1
+    result = outcome(x, o)
+    if result is not None:
+        return result
+    x_turn = x.bit_count() == o.bit_count()
+    values = []
+    free = FULL & ~(x | o)
+    for i in range(CELLS):
+        bit = 1 << i
+        if free & bit:
+            values.append(plain_value(x | bit, o, stats) if x_turn else plain_value(x, o | bit, stats))
+    return max(values) if x_turn else min(values)
+
+
+def alphabeta(x, o, alpha, beta, ply, killers, stats):
+    """
+    Returns the game value for X, searching only what can still change
+    the result within the (alpha, beta) window.
+
+    Moves are tried killer first (the move that last caused a cutoff at
+    this ply), then center, corners and edges.
+    """
+    stats.nodes += 1
+    result = outcome(x, o)
+    if result is not None:
+        return result
+    x_turn = x.bit_count() == o.bit_count()
+    free = FULL & ~(x | o)
+    killer = killers[ply]
+    moves = ORDER if killer is None or not free & (1 << killer) else [killer] + ORDER
+
+    best = -2 if x_turn else 2
+    for i in moves:
+        bit = 1 << i
+        if not free & bit:
+            continue
+        free &= ~bit
+        if x_turn:
+            child = alphabeta(x | bit, o, alpha, beta, ply + 1, killers, stats)
+            if child > best:
+                best = child
+            if best > alpha:
+                alpha = best
+        else:
+            child = alphabeta(x, o | bit, alpha, beta, ply + 1, killers, stats)
+            if child < best:
+                best = child
+            if best < beta:
+                beta = best
+        if alpha >= beta:
+            killers[ply] = i
+            break
+    return best
+
+
+def alphabeta_move(x, o, stats=None):
+    """
+    Returns the cell index of an optimal move for the player to move,
+    found with alpha-beta search, or None if the game is over.
+    """
+    if outcome(x, o) is not None:
+        return None
+    stats = stats if stats is not None else SearchStats()
+    killers = [None] * (CELLS + 1)
+    x_turn = x.bit_count() == o.bit_count()
+    best = None
+    alpha, beta = -2, 2
+    free = FULL & ~(x | o)
+    for i in ORDER:
+        bit = 1 << i
+        if not free & bit:
+            continue
+        if x_turn:
+            child = alphabeta(x | bit, o, alpha, beta, 1, killers, stats)
+            if best is None or child > alpha:
+                best, alpha = i, child
+        else:
+            child = alphabeta(x, o | bit, alpha, beta, 1, killers, stats)
+            if best is None or child < beta:
+                best, beta = i, child
+        if alpha >= 1 or beta <= -1:
+            break
+    return best
+
+
+def plain_move(x, o, stats=None):
+    """
+    Returns the cell index of an optimal move for the player to move,
+    found by exhaustive search, or None if the game is over.
+    """
+    if outcome(x, o) is not None:
+        return None
+    stats = stats if stats is not None else SearchStats()
+    x_turn = x.bit_count() == o.bit_count()
+    best = None
+    best_value = None
+    free = FULL & ~(x | o)
+    for i in ORDER:
+        bit = 1 << i
+        if not free & bit:
+            continue
+        child = plain_value(x | bit, o, stats) if x_turn else -plain_value(x, o | bit, stats)
+        if best is None or child > best_value:
+            best, best_value = i, child
+    return best
+
+
+class Timeout(Exception):
+    """
+    Raised inside a search when its time budget runs out or it is stopped.
+    """
+
+
+class Deepening():
+    """
+    Iterative deepening negamax search with alpha-beta pruning, a
+    transposition table, killer moves and a heuristic evaluation at
+    the depth limit, bounded by a time budget.
+    """
+
+    # Positions searched between checks of the clock
+    CHECK_EVERY = 512
+
+    def __init__(self, budget=None, stop=None, stats=None):
+        self.deadline = time.perf_counter() + (TIME_BUDGET if budget is None else budget)
+        self.stop = stop
+        self.stats = stats if stats is not None else SearchStats()
+        self.killers = [None] * (CELLS + 1)
+
+    def move(self, x, o):
+        """
+        Returns the cell index of the best move found for the player to
+        move in the time allowed, or None if the game is over.
+        """
+        if outcome(x, o) is not None:
+            return None
+        me, them = (x, o) if x.bit_count() == o.bit_count() else (o, x)
+        free = FULL & ~(x | o)
+        moves = [i for i in ORDER if free >> i & 1]
+
+        # Take a win or block a loss at once
+        for player in (me, them):
+            for i in moves:
+                if won_through(player | 1 << i, i):
+                    return i
+
+        best = moves[0]
+        for depth in range(1, len(moves) + 1):
+            try:
+                score, move = self.root(me, them, moves, depth)
+            except Timeout:
+                break
+            best = move
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(score) >= WIN - CELLS:
+                break
+        return best
+
+    def root(self, me, them, moves, depth):
+        """
+        Searches every root move to depth and returns (score, move).
+        """
+        alpha = -WIN - 1
+        best = None
+        for i in moves:
+            score = -self.negamax(them, me | 1 << i, depth - 1, -WIN - 1, -alpha, 1, i)
+            if best is None or score > alpha:
+                alpha, best = score, i
+        return alpha, best
+
+    def negamax(self, me, them, depth, alpha, beta, ply, last):
+        """
+        Returns the score of a position for the player to move (me),
+        given that the opponent has just played cell last.
+        """
+        stats = self.stats
+        stats.nodes += 1
+        if stats.nodes % Deepening.CHECK_EVERY == 0:
+            if time.perf_counter() > self.deadline or (self.stop is not None and self.stop()):
+                raise Timeout()
+
+        if won_through(them, last):
+            return -(WIN - ply)
+        occupied = me | them
+        if occupied == FULL:
+            return 0
+        if depth == 0:
+            return evaluate(me, them)
+
+        original_alpha = alpha
+        key = (me, them)
+        entry = deep_table.get(key)
+        hint = None
+        if entry is not None:
+            entry_depth, score, bound, hint = entry
+            if entry_depth >= depth:
+                score = from_table(score, ply)
+                if bound == 0:
+                    return score
+                if bound < 0 and score <= alpha:
+                    return score
+                if bound > 0 and score >= beta:
+                    return score
+
+        killer = self.killers[ply]
+        best_score = -WIN - 1
+        best = None
+        for i in moves_to_try(occupied, hint, killer):
+            score = -self.negamax(them, me | 1 << i, depth - 1, -beta, -alpha, ply + 1, i)
+            if score > best_score:
+                best_score, best = score, i
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.killers[ply] = i
+                break
+
+        if best_score <= original_alpha:
+            bound = -1
+        elif best_score >= beta:
+            bound = 1
+        else:
+            bound = 0
+        deep_table[key] = (depth, to_table(best_score, ply), bound, best)
+        return best_score
+
+
+def moves_to_try(occupied, hint, killer):
+    """
+    Yields the free cells: the transposition table's best move first,
+    then the killer move, then the rest nearest the center first.
+    """
+    tried = 0
+    for i in (hint, killer):
+        if i is not None and not (occupied | tried) >> i & 1:
+            tried |= 1 << i
+            yield i
+    for i in ORDER:
+        if not (occupied | tried) >> i & 1:
+            yield i
+
+
+def to_table(score, ply):
+    """
+    Converts a win or loss score to a distance from this position,
+    so it stays correct when the position is reached at another ply.
+    """
+    if score >= WIN - CELLS:
+        return score + ply
+    if score <= -(WIN - CELLS):
+        return score - ply
+    return score
+
+
+def from_table(score, ply):
+    """
+    Converts a stored win or loss score back to a distance from the root.
+    """
+    if score >= WIN - CELLS:
+        return score - ply
+    if score <= -(WIN - CELLS):
+        return score + ply
+    return score
+
+
+def evaluate(me, them):
+    """
+    Returns a heuristic score for the player to move: every line still
+    open to only one player counts for that player, more the fuller it is.
+    """
+    score = 0
+    for line in LINES:
+        mine = me & line
+        theirs = them & line
+        if mine and not theirs:
+            score += 4 ** mine.bit_count()
+        elif theirs and not mine:
+            score -= 4 ** theirs.bit_count()
+    return score
+
+
+def deepening_move(x, o, stats=None, budget=None, stop=None):
+    """
+    Returns the cell index of the best move the iterative deepening
+    search finds within budget seconds (TIME_BUDGET by default), or None
+    if the game is over. The search ends early if stop() returns True.
+    """
+    return Deepening(budget, stop, stats).move(x, o)
+
+
+# Searches minimax can use, by name
+SEARCHES = {
+    "table": best_move,
+    "alphabeta": alphabeta_move,
+    "plain": plain_move,
+    "deepening": deepening_move
+}
@@ -1,9 +1,71 @@
 import pygame
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
 import tictactoe as ttt
 
+# Board size and win length: python runner.py [rows columns k]
+if len(sys.argv) == 4:
+    ttt.configure(*(int(arg) for arg in sys.argv[1:]))
+elif len(sys.argv) != 1:
+    sys.exit("Usage: python runner.py [rows columns k]")
+rows, columns = ttt.engine.ROWS, ttt.engine.COLUMNS
+ttt.use_book()
+
+# Seconds the AI may think per move
+ai_budget = 0.5
+
+# Least seconds "Computer thinking..." shows before the AI moves
+ai_delay = 0.5
+
+# The AI searches on a worker thread so the window keeps responding
+executor = ThreadPoolExecutor(max_workers=1)
+thinking = None
+
+
+def start_thinking(board):
+    """
+    Starts searching for the AI's move on the worker thread.
+    Returns the search's future, its stop event and its start time.
+    """
+    stop = threading.Event()
+    future = executor.submit(ttt.minimax, board, budget=ai_budget, stop=stop.is_set)
+    return future, stop, time.perf_counter()
+
+
+def stop_thinking(thinking):
+    """
+    Cancels a search, or asks it to stop early if it has already started.
+    """
+    if thinking is not None:
+        future, stop, _ = thinking
+        stop.set()
+        future.cancel()
+
+
+def start_over(thinking):
+    """
+    Stops any search and waits for it to finish, then clears the
+    engine's deepening table, which only helps within one game.
+    """
+    stop_thinking(thinking)
+    if thinking is not None:
+        wait([thinking[0]])
+    ttt.engine.clear()
+
+
+def shut_down():
+    """
+    Stops any search, waits for the worker thread to finish, and exits.
+    """
+    stop_thinking(thinking)
+    executor.shutdown(wait=True, cancel_futures=True)
+    pygame.quit()
+    sys.exit()
+
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -15,17 +77,25 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+tile_size = min(80, int((height - 140) / rows), int((width - 40) / columns))
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", int(tile_size * 3 / 4))
+
+clock = pygame.time.Clock()
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
-            sys.exit()
+            shut_down()
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            # Start over, abandoning any search in progress
+            start_over(thinking)
+            thinking = None
+            user = None
+            board = ttt.initial_state()
 
     screen.fill(black)
 
@@ -67,13 +137,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (columns / 2 * tile_size),
+                       height / 2 - (rows / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(rows):
             row = []
-            for j in range(3):
+            for j in range(columns):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -110,20 +179,20 @@ while True:
 
         # Check for AI move
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
+            if thinking is None:
+                thinking = start_thinking(board)
             else:
-                ai_turn = True
+                future, _, start = thinking
+                if future.done() and time.perf_counter() - start >= ai_delay:
+                    board = ttt.result(board, future.result())
+                    thinking = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(rows):
+                for j in range(columns):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -139,8 +208,12 @@ while True:
                 mouse = pygame.mouse.get_pos()
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
+                    start_over(thinking)
+                    thinking = None
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
 
     pygame.display.flip()
+
+    # Sleep off the rest of the frame, leaving the search thread the CPU
+    clock.tick(60)
@@ -2,79 +2,162 @@
 Tic Tac Toe Player
 """
 
-import math
-import copy
+import book as opening_book
+import engine
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Opening book minimax answers from, once use_book() is called
+book = None
+
+
+def configure(rows=3, columns=3, k=3):
+    """
+    Plays on a rows by columns board, won by k in a row.
+    """
+    engine.configure(rows, columns, k)
+
+
+def use_book(path=opening_book.BOOK):
+    """
+    Loads the opening book for the current board, so that minimax looks
+    moves up instead of searching. Boards too large for a book are
+    searched as before.
+    """
+    global book
+    book = opening_book.load(path) if engine.CELLS <= opening_book.MAX_CELLS else None
+
+
+class Board():
+    """
+    Immutable, hashable board state: the X and O bitmasks of the engine,
+    the mask of empty cells, the number of moves made and the winner,
+    which is kept up to date by checking only the lines through each
+    new mark.
+
+    board[i] is row i as a tuple of marks, so board[i][j] reads a cell
+    just as it would on a list of lists.
+    """
+    __slots__ = ("x", "o", "empty", "moves", "winner")
+
+    def __init__(self, x=0, o=0, winner=None):
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "o", o)
+        object.__setattr__(self, "empty", engine.FULL & ~(x | o))
+        object.__setattr__(self, "moves", x.bit_count() + o.bit_count())
+        object.__setattr__(self, "winner", winner)
+
+    @classmethod
+    def from_lists(cls, board):
+        """
+        Returns the Board for a list-of-lists board.
+        """
+        x, o = engine.encode(board)
+        return cls(x, o, X if engine.won(x) else O if engine.won(o) else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Board is immutable")
+
+    def __reduce__(self):
+        return (Board, (self.x, self.o, self.winner))
+
+    def __eq__(self, other):
+        return isinstance(other, Board) and self.x == other.x and self.o == other.o
+
+    def __hash__(self):
+        return hash((self.x, self.o))
+
+    def __len__(self):
+        return engine.ROWS
+
+    def __getitem__(self, i):
+        if not 0 <= i < engine.ROWS:
+            raise IndexError("row out of range")
+        first = engine.cell(i, 0)
+        return tuple(
+            X if self.x >> n & 1 else O if self.o >> n & 1 else EMPTY
+            for n in range(first, first + engine.COLUMNS)
+        )
+
+    def __iter__(self):
+        for i in range(engine.ROWS):
+            yield self[i]
+
+    def __repr__(self):
+        return f"Board({[list(row) for row in self]})"
+
+    def to_lists(self):
+        """
+        Returns the board as a list of lists.
+        """
+        return [list(row) for row in self]
+
+
+def as_board(board):
+    """
+    Returns board as a Board, converting a list of lists.
+    """
+    return board if isinstance(board, Board) else Board.from_lists(board)
+
 
 def initial_state(): # WORKS
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return Board()
 
 
 def player(board): # WORKS
-    res = 0
-    for row in board:
-        for column in row:
-            if column != EMPTY:
-                res += 1
-    if (res % 2) == 0:
-        return X
-    else:
-        return O
+    """
+    Returns the player who has the next turn on a board.
+    """
+    return X if as_board(board).moves % 2 == 0 else O
 
 
 def actions(board):
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
+    empty = as_board(board).empty
     res = set()
-    for r_index, row in enumerate(board):
-        for c_index, column in enumerate(row):
-            if column == EMPTY:
-                res.add((r_index, c_index))
+    while empty:
+        low = empty & -empty
+        res.add(divmod(low.bit_length() - 1, engine.COLUMNS))
+        empty ^= low
     return res
 
 
 def result(board, action): # WORKS
-    res = copy.deepcopy(board)
-    for r_index, row in enumerate(board):
-        for c_index, column in enumerate(row):
-            if column == EMPTY and r_index == action[0] and c_index == action[1]:
-                res[r_index][c_index] = player(board)
-                return res  
-            elif row == action[0] and column == action[1]:
-                raise Exception("Movement Not Valid")
-    return res
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    board = as_board(board)
+    i, j = action
+    if not (0 <= i < engine.ROWS and 0 <= j < engine.COLUMNS) or not board.empty >> engine.cell(i, j) & 1:
+        raise Exception("Movement Not Valid")
+    n = engine.cell(i, j)
+    if board.moves % 2 == 0:
+        x = board.x | 1 << n
+        return Board(x, board.o, board.winner or (X if engine.won_through(x, n) else None))
+    o = board.o | 1 << n
+    return Board(board.x, o, board.winner or (O if engine.won_through(o, n) else None))
+
 
 def winner(board): # WORKS
-    var = X
-    for _ in range(2):
-        for row in board:
-            if row == [var, var, var]: # Horizontal
-                return var
-        if board[0][0] == var and board[1][1] == var and board[2][2] == var: # Diagonal
-                return var
-        for n in range(3):
-            if board[0][n] == var and board[1][n] == var and board[2][n] == var: # Vertical
-                    return var
-        var = O
-    return None
+    """
+    Returns the winner of the game, if there is one.
+    """
+    return as_board(board).winner
 
 
 def terminal(board): # WORKS
-    if winner(board) != None:
-        return True
-    res = True
-    for row in board:
-        for column in row:
-            if column == EMPTY:
-                res = False
-    return res
+    """
+    Returns True if game is over, False otherwise.
+    """
+    board = as_board(board)
+    return board.winner is not None or not board.empty
 
 
 def utility(board): # WORKS
@@ -90,22 +173,34 @@ def utility(board): # WORKS
     return 0
 
 
-def minimax(board):
+def minimax(board, search=None, stats=None, budget=None, stop=None):
     """
     Returns the optimal action for the current player on the board.
+
+    By default the move is looked up in the opening book, if one has
+    been loaded with use_book(). Otherwise search names one of
+    engine.SEARCHES: "table" (memoized, the default on boards of up to
+    9 cells), "alphabeta", "plain" or "deepening" (iterative deepening,
+    the default on larger boards, which may not be solvable outright).
+    If given, stats counts the nodes searched.
+    The deepening search returns its best move after budget seconds
+    (engine.TIME_BUDGET by default), or sooner once stop() returns True.
     """
-    possible = actions(board)
-    res = (1, None)
+    board = as_board(board)
     if terminal(board):
         return None
-    for action in possible:
-        implemented = result(action=action, board=board)
-        use = MaxValue(implemented)
-        #print(use)
-        if use < res[0]:
-            res = action
-    print(res, use)
-    return res
+    x, o = board.x, board.o
+    if search is None and book is not None:
+        move = book.move(x, o)
+        if move is not None:
+            return divmod(move, engine.COLUMNS)
+    if search is None:
+        search = "table" if engine.CELLS <= 9 else "deepening"
+    if search == "deepening":
+        move = engine.deepening_move(x, o, stats, budget, stop)
+    else:
+        move = engine.SEARCHES[search](x, o, stats)
+    return divmod(move, engine.COLUMNS)
 
 def MaxValue(state):
     if terminal(state):
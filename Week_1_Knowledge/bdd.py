@@ -0,0 +1,306 @@
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Node IDs of the two terminals
+FALSE = 0
+TRUE = 1
+
+
+class BDD():
+    """
+    Reduced ordered binary decision diagrams over a fixed order of
+    symbols, for counting the models of sentences.
+
+    Nodes are integer IDs; node u tests the symbol at level
+    levels[u] and continues to lows[u] if it is false or highs[u] if
+    it is true. Equal nodes are shared through a unique table, so a
+    sentence compiles to a single canonical node.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self.index = {symbol: level for level, symbol in enumerate(self.symbols)}
+        if len(self.index) != len(self.symbols):
+            raise ValueError("symbols must be distinct")
+
+        # The terminals sit below every symbol's level
+        self.levels = [len(self.symbols), len(self.symbols)]
+        self.lows = [FALSE, TRUE]
+        self.highs = [FALSE, TRUE]
+        self.unique = {}
+        self.computed = {}
+
+    def node(self, level, low, high):
+        """Returns the node testing the symbol at level, reduced and shared."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        u = self.unique.get(key)
+        if u is None:
+            u = len(self.levels)
+            self.levels.append(level)
+            self.lows.append(low)
+            self.highs.append(high)
+            self.unique[key] = u
+        return u
+
+    def variable(self, symbol):
+        """Returns the node that is true exactly when symbol is."""
+        if symbol not in self.index:
+            raise KeyError(f"symbol {symbol} not in the order")
+        return self.node(self.index[symbol], FALSE, TRUE)
+
+    def negate(self, u):
+        """Returns the node for the negation of u."""
+        return self.apply("xor", u, TRUE)
+
+    def apply(self, operator, u, v):
+        """
+        Returns the node for u operator v, where operator is "and",
+        "or" or "xor", memoizing every pair of nodes combined.
+
+        Pairs are combined with an explicit stack rather than recursion,
+        so diagrams deeper than Python's recursion limit still work.
+        """
+        terminal = self.terminal
+        computed = self.computed
+        levels, lows, highs = self.levels, self.lows, self.highs
+
+        # A pair (u, v) expands into its two cofactor pairs and then a
+        # level marker, which combines their results from the top of
+        # results into a node once both are known
+        results = []
+        stack = [(u, v, None)]
+        while stack:
+            u, v, level = stack.pop()
+            if level is not None:
+                high = results.pop()
+                low = results.pop()
+                result = self.node(level, low, high)
+                computed[(operator, u, v)] = result
+                results.append(result)
+                continue
+            result = terminal(operator, u, v)
+            if result is None:
+                if u > v:
+                    u, v = v, u
+                result = computed.get((operator, u, v))
+            if result is not None:
+                results.append(result)
+                continue
+            level_u, level_v = levels[u], levels[v]
+            level = min(level_u, level_v)
+            u_low, u_high = (lows[u], highs[u]) if level_u == level else (u, u)
+            v_low, v_high = (lows[v], highs[v]) if level_v == level else (v, v)
+            stack.append((u, v, level))
+            stack.append((u_high, v_high, None))
+            stack.append((u_low, v_low, None))
+        return results.pop()
+
+    @staticmethod
+    def terminal(operator, u, v):
+        """
+        Returns the node for u operator v if it follows directly from
+        a terminal or from u and v being equal, or None otherwise.
+        """
+        if operator == "and":
+            if u == FALSE or v == FALSE:
+                return FALSE
+            if u == TRUE:
+                return v
+            if v == TRUE or u == v:
+                return u
+        elif operator == "or":
+            if u == TRUE or v == TRUE:
+                return TRUE
+            if u == FALSE:
+                return v
+            if v == FALSE or u == v:
+                return u
+        else:
+            if u == v:
+                return FALSE
+            if u == FALSE:
+                return v
+            if v == FALSE:
+                return u
+            if u == TRUE and v == TRUE:
+                return FALSE
+        return None
+
+    def compile(self, sentence):
+        """Returns the node for a sentence."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return self.negate(self.compile(sentence.operand))
+        if isinstance(sentence, And):
+            result = TRUE
+            for conjunct in sentence.conjuncts:
+                result = self.apply("and", result, self.compile(conjunct))
+                if result == FALSE:
+                    break
+            return result
+        if isinstance(sentence, Or):
+            result = FALSE
+            for disjunct in sentence.disjuncts:
+                result = self.apply("or", result, self.compile(disjunct))
+                if result == TRUE:
+                    break
+            return result
+        if isinstance(sentence, Implication):
+            antecedent = self.negate(self.compile(sentence.antecedent))
+            return self.apply("or", antecedent, self.compile(sentence.consequent))
+        if isinstance(sentence, Biconditional):
+            difference = self.apply("xor", self.compile(sentence.left), self.compile(sentence.right))
+            return self.negate(difference)
+        raise TypeError("must be a logical sentence")
+
+    def reachable(self, root):
+        """Returns the internal nodes reachable from root, parents first."""
+        seen = set()
+        order = []
+        stack = [root]
+        while stack:
+            u = stack.pop()
+            if u <= TRUE or u in seen:
+                continue
+            seen.add(u)
+            order.append(u)
+            stack.append(self.lows[u])
+            stack.append(self.highs[u])
+        order.sort(key=self.levels.__getitem__)
+        return order
+
+    def counts(self, root, nodes=None):
+        """
+        Returns a dict giving, for root and each node below it, the number
+        of assignments to the symbols from its level down that satisfy it.
+        """
+        nodes = nodes if nodes is not None else self.reachable(root)
+        levels = self.levels
+        counts = {FALSE: 0, TRUE: 1}
+        for u in reversed(nodes):
+            low, high = self.lows[u], self.highs[u]
+            counts[u] = (counts[low] << (levels[low] - levels[u] - 1)) + \
+                (counts[high] << (levels[high] - levels[u] - 1))
+        return counts
+
+    def count(self, root):
+        """Returns the number of models of root over all the symbols."""
+        return self.counts(root)[root] << self.levels[root]
+
+    def true_counts(self, root):
+        """
+        Returns a dict giving, for each symbol, the number of models of
+        root in which it is true, in one pass down the diagram.
+
+        Each edge from u to a child carries paths[u] * counts[child]
+        models scaled by the levels it skips. The symbol tested at u is
+        true in the models along the high edge, and every symbol skipped
+        by an edge is true in exactly half of the models along it.
+        """
+        n = len(self.symbols)
+        nodes = self.reachable(root)
+        counts = self.counts(root, nodes)
+        levels = self.levels
+
+        # paths[u]: assignments to the symbols above u leading to it
+        paths = {root: 1 << levels[root]}
+        totals = [0] * n
+
+        # halves[level] accumulates models along edges that skip level,
+        # as a difference array over levels
+        halves = [0] * (n + 1)
+        if levels[root] > 0 and counts[root]:
+            models = (counts[root] << levels[root]) // 2
+            halves[0] += models
+            halves[levels[root]] -= models
+
+        for u in nodes:
+            level = levels[u]
+            for child, value in ((self.lows[u], False), (self.highs[u], True)):
+                gap = levels[child] - level - 1
+                models = paths[u] * (counts[child] << gap)
+                if not models:
+                    continue
+                if value:
+                    totals[level] += models
+                if gap:
+                    halves[level + 1] += models // 2
+                    halves[levels[child]] -= models // 2
+                if child > TRUE:
+                    paths[child] = paths.get(child, 0) + (paths[u] << gap)
+
+        running = 0
+        for level in range(n):
+            running += halves[level]
+            totals[level] += running
+        return dict(zip(self.symbols, totals))
+
+    def marginals(self, root):
+        """
+        Returns a dict giving, for each symbol, the probability that it is
+        true given root, with every model equally likely.
+        Raises ValueError if root has no models.
+        """
+        total = self.count(root)
+        if not total:
+            raise ValueError("sentence has no models")
+        return {symbol: count / total for symbol, count in self.true_counts(root).items()}
+
+
+def order(sentence):
+    """
+    Returns the symbols of a sentence in the order they first appear,
+    which keeps symbols used together close in the diagram.
+    """
+    symbols = {}
+    stack = [sentence]
+    while stack:
+        s = stack.pop()
+        if isinstance(s, Symbol):
+            symbols.setdefault(s.name, None)
+        elif isinstance(s, Not):
+            stack.append(s.operand)
+        elif isinstance(s, And):
+            stack.extend(reversed(s.conjuncts))
+        elif isinstance(s, Or):
+            stack.extend(reversed(s.disjuncts))
+        elif isinstance(s, Implication):
+            stack.extend((s.consequent, s.antecedent))
+        elif isinstance(s, Biconditional):
+            stack.extend((s.right, s.left))
+    return list(symbols)
+
+
+def compile_sentence(sentence, symbols=None):
+    """
+    Returns a BDD over symbols (by default those of sentence, in the
+    order they appear) and the node for sentence in it.
+    """
+    if symbols is None:
+        symbols = order(sentence)
+    else:
+        symbols = list(symbols)
+        known = set(symbols)
+        symbols += [symbol for symbol in order(sentence) if symbol not in known]
+    bdd = BDD(symbols)
+    return bdd, bdd.compile(sentence)
+
+
+def count_models(knowledge, symbols=None):
+    """
+    Returns the number of models of knowledge over its symbols and any
+    others in symbols.
+    """
+    bdd, root = compile_sentence(knowledge, symbols)
+    return bdd.count(root)
+
+
+def marginals(knowledge, symbols=None):
+    """
+    Returns a dict giving, for each symbol of knowledge (and of symbols),
+    the fraction of the models of knowledge in which it is true.
+    """
+    bdd, root = compile_sentence(knowledge, symbols)
+    return bdd.marginals(root)
@@ -1,7 +1,29 @@
+import functools
 import itertools
+import weakref
+
+# Most clauses converting one sentence to CNF may produce before
+# model_check evaluates the sentence tree bitwise instead
+CNF_LIMIT = 10000
+
+# Most sentences whose clauses model_check remembers between calls
+CNF_CACHE_SIZE = 32
+
+# Number of variables whose assignments are evaluated at once,
+# as bits of one integer; a block holds 2 ** BLOCK_VARIABLES models
+BLOCK_VARIABLES = 16
+
+
+class EvaluationException(Exception):
+    pass
+
+
+class CNFTooLarge(Exception):
+    pass
 
 
 class Sentence():
+    __slots__ = ("frozen", "_hash", "_symbols", "__weakref__")
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -15,6 +37,30 @@ class Sentence():
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def clauses(self, ids, positive=True):
+        """
+        Returns the sentence (or its negation, if not positive) in
+        conjunctive normal form: a list of clauses, each a tuple of
+        literals, where ids maps symbol names to positive integers and
+        a negative integer is a negated symbol.
+        """
+        raise Exception("nothing to convert")
+
+    def bits(self, columns, full):
+        """
+        Evaluates the sentence in many models at once: columns maps
+        each symbol name to an integer whose bits give its value in
+        each model, and full has a bit set for every model.
+        """
+        raise Exception("nothing to evaluate")
+
+    def __reduce__(self):
+        return (type(self), self.arguments())
+
+    def arguments(self):
+        """Returns the arguments the sentence was constructed with."""
+        return ()
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -42,17 +88,88 @@ class Sentence():
             return f"({s})"
 
 
-class Symbol(Sentence):
+# Weak references to every Interned sentence alive, by class and the
+# identities of its parts
+interned = {}
+
+
+def forget(reference):
+    """Removes the entry of an Interned sentence that no longer exists."""
+    if interned.get(reference.key) is reference:
+        del interned[reference.key]
+
 
-    def __init__(self, name):
-        self.name = name
+def frozen(sentence):
+    """Returns True if a sentence and everything in it is immutable."""
+    return getattr(sentence, "frozen", False)
+
+
+class Interned(Sentence):
+    """
+    Sentence that is immutable and hash-consed: constructing a sentence
+    equal to one that already exists returns the existing object, so
+    equal sentences share one node. Hashes and symbol sets are cached
+    on nodes that contain no mutable And.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, key, parts, fields):
+        """
+        Creates and interns the sentence for key: fields pairs each slot
+        with its value, and parts lists the sentences it is made of.
+        """
+        node = object.__new__(cls)
+        set_field = object.__setattr__
+        for name, value in fields:
+            set_field(node, name, value)
+        is_frozen = all(frozen(part) for part in parts)
+        set_field(node, "frozen", is_frozen)
+        set_field(node, "_symbols", None)
+        set_field(node, "_hash", None)
+        if is_frozen:
+            set_field(node, "_hash", hash(node))
+        interned[key] = weakref.KeyedRef(node, forget, key)
+        return node
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} sentences are immutable")
+
+    def symbols(self):
+        if self._symbols is not None:
+            return set(self._symbols)
+        symbols = self.find_symbols()
+        if self.frozen:
+            object.__setattr__(self, "_symbols", frozenset(symbols))
+        return symbols
+
+    def find_symbols(self):
+        """Returns a new set of all symbols in the sentence."""
+        return set()
+
+
+class Symbol(Interned):
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        key = (cls, name)
+        reference = interned.get(key)
+        node = reference() if reference is not None else None
+        if node is None:
+            node = cls.create(key, (), (("name", name),))
+        return node
 
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or isinstance(other, Symbol) and self.name == other.name
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("symbol", self.name))
 
+    def arguments(self):
+        return (self.name,)
+
     def __repr__(self):
         return self.name
 
@@ -65,21 +182,43 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
+    def find_symbols(self):
         return {self.name}
 
+    def clauses(self, ids, positive=True):
+        return [(ids[self.name] if positive else -ids[self.name],)]
+
+    def bits(self, columns, full):
+        return columns[self.name]
+
 
-class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
+class Not(Interned):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
+        key = (cls, id(operand))
+        reference = interned.get(key)
+        node = reference() if reference is not None else None
+        if node is None:
+            Sentence.validate(operand)
+            node = cls.create(key, (operand,), (("operand", operand),))
+        return node
 
     def __eq__(self, other):
+        if self is other:
+            return True
+        if self.frozen and frozen(other):
+            return False
         return isinstance(other, Not) and self.operand == other.operand
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("not", hash(self.operand)))
 
+    def arguments(self):
+        return (self.operand,)
+
     def __repr__(self):
         return f"Not({self.operand})"
 
@@ -89,23 +228,49 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
+    def find_symbols(self):
         return self.operand.symbols()
 
+    def clauses(self, ids, positive=True):
+        return self.operand.clauses(ids, not positive)
+
+    def bits(self, columns, full):
+        return full ^ self.operand.bits(columns, full)
+
 
 class And(Sentence):
+    """
+    Conjunction, which unlike other sentences can grow with add(), so it
+    is never interned. Its hash and symbols are cached, and kept up to
+    date as conjuncts are added, while every conjunct is frozen; loose
+    counts those that are not.
+    """
+    __slots__ = ("conjuncts", "loose")
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self.loose = sum(not frozen(conjunct) for conjunct in conjuncts)
+        self.frozen = False
+        self._hash = None
+        self._symbols = None
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or isinstance(other, And) and self.conjuncts == other.conjuncts
 
     def __hash__(self):
-        return hash(
+        if self._hash is not None:
+            return self._hash
+        result = hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
+        if not self.loose:
+            self._hash = result
+        return result
+
+    def arguments(self):
+        return tuple(self.conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -116,6 +281,12 @@ class And(Sentence):
     def add(self, conjunct):
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
+        self._hash = None
+        if not frozen(conjunct):
+            self.loose += 1
+            self._symbols = None
+        elif self._symbols is not None:
+            self._symbols.update(conjunct.symbols())
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -127,23 +298,59 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
-
-class Or(Sentence):
-    def __init__(self, *disjuncts):
-        for disjunct in disjuncts:
-            Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        if self._symbols is not None:
+            return set(self._symbols)
+        symbols = set()
+        for conjunct in self.conjuncts:
+            symbols.update(conjunct.symbols())
+        if not self.loose:
+            self._symbols = set(symbols)
+        return symbols
+
+    def clauses(self, ids, positive=True):
+        if positive:
+            return conjoin(conjunct.clauses(ids) for conjunct in self.conjuncts)
+        return disjoin(conjunct.clauses(ids, False) for conjunct in self.conjuncts)
+
+    def bits(self, columns, full):
+        result = full
+        for conjunct in self.conjuncts:
+            result &= conjunct.bits(columns, full)
+            if not result:
+                break
+        return result
+
+
+class Or(Interned):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
+        key = (cls, *map(id, disjuncts))
+        reference = interned.get(key)
+        node = reference() if reference is not None else None
+        if node is None:
+            for disjunct in disjuncts:
+                Sentence.validate(disjunct)
+            node = cls.create(key, disjuncts, (("disjuncts", disjuncts),))
+        return node
 
     def __eq__(self, other):
+        if self is other:
+            return True
+        if self.frozen and frozen(other):
+            return False
         return isinstance(other, Or) and self.disjuncts == other.disjuncts
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
 
+    def arguments(self):
+        return self.disjuncts
+
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
@@ -157,25 +364,57 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
-
-class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
-        Sentence.validate(antecedent)
-        Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+    def find_symbols(self):
+        symbols = set()
+        for disjunct in self.disjuncts:
+            symbols.update(disjunct.symbols())
+        return symbols
+
+    def clauses(self, ids, positive=True):
+        if positive:
+            return disjoin(disjunct.clauses(ids) for disjunct in self.disjuncts)
+        return conjoin(disjunct.clauses(ids, False) for disjunct in self.disjuncts)
+
+    def bits(self, columns, full):
+        result = 0
+        for disjunct in self.disjuncts:
+            result |= disjunct.bits(columns, full)
+            if result == full:
+                break
+        return result
+
+
+class Implication(Interned):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
+        key = (cls, id(antecedent), id(consequent))
+        reference = interned.get(key)
+        node = reference() if reference is not None else None
+        if node is None:
+            Sentence.validate(antecedent)
+            Sentence.validate(consequent)
+            node = cls.create(key, (antecedent, consequent),
+                              (("antecedent", antecedent), ("consequent", consequent)))
+        return node
 
     def __eq__(self, other):
+        if self is other:
+            return True
+        if self.frozen and frozen(other):
+            return False
         return (isinstance(other, Implication)
                 and self.antecedent == other.antecedent
                 and self.consequent == other.consequent)
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
+    def arguments(self):
+        return (self.antecedent, self.consequent)
+
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
@@ -188,25 +427,48 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
+    def find_symbols(self):
         return set.union(self.antecedent.symbols(), self.consequent.symbols())
 
+    def clauses(self, ids, positive=True):
+        if positive:
+            return disjoin([self.antecedent.clauses(ids, False), self.consequent.clauses(ids)])
+        return conjoin([self.antecedent.clauses(ids), self.consequent.clauses(ids, False)])
+
+    def bits(self, columns, full):
+        return (full ^ self.antecedent.bits(columns, full)) | self.consequent.bits(columns, full)
+
 
-class Biconditional(Sentence):
-    def __init__(self, left, right):
-        Sentence.validate(left)
-        Sentence.validate(right)
-        self.left = left
-        self.right = right
+class Biconditional(Interned):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
+        key = (cls, id(left), id(right))
+        reference = interned.get(key)
+        node = reference() if reference is not None else None
+        if node is None:
+            Sentence.validate(left)
+            Sentence.validate(right)
+            node = cls.create(key, (left, right), (("left", left), ("right", right)))
+        return node
 
     def __eq__(self, other):
+        if self is other:
+            return True
+        if self.frozen and frozen(other):
+            return False
         return (isinstance(other, Biconditional)
                 and self.left == other.left
                 and self.right == other.right)
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
+    def arguments(self):
+        return (self.left, self.right)
+
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
@@ -221,12 +483,179 @@ class Biconditional(Sentence):
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
+    def find_symbols(self):
         return set.union(self.left.symbols(), self.right.symbols())
 
+    def clauses(self, ids, positive=True):
+        left, right = self.left.clauses(ids), self.right.clauses(ids)
+        not_left, not_right = self.left.clauses(ids, False), self.right.clauses(ids, False)
+        if positive:
+            return conjoin([disjoin([not_left, right]), disjoin([left, not_right])])
+        return conjoin([disjoin([left, right]), disjoin([not_left, not_right])])
+
+    def bits(self, columns, full):
+        return full ^ self.left.bits(columns, full) ^ self.right.bits(columns, full)
+
+
+def conjoin(cnfs):
+    """Returns the CNF of a conjunction of CNFs, without repeated clauses."""
+    clauses = []
+    seen = set()
+    for cnf in cnfs:
+        for clause in cnf:
+            if clause not in seen:
+                seen.add(clause)
+                clauses.append(clause)
+    if len(clauses) > CNF_LIMIT:
+        raise CNFTooLarge(f"more than {CNF_LIMIT} clauses")
+    return clauses
+
+
+def disjoin(cnfs):
+    """
+    Returns the CNF of a disjunction of CNFs, by distributing it over
+    their clauses and dropping clauses that are always true.
+    """
+    clauses = [()]
+    for cnf in cnfs:
+        if len(clauses) * len(cnf) > CNF_LIMIT:
+            raise CNFTooLarge(f"more than {CNF_LIMIT} clauses")
+        clauses = [
+            merged
+            for clause in clauses
+            for other in cnf
+            if (merged := merge(clause, other)) is not None
+        ]
+        if not clauses:
+            break
+    return conjoin([clauses])
+
+
+def merge(clause, other):
+    """
+    Returns the disjunction of two clauses as one sorted clause,
+    or None if it contains a literal and its negation.
+    """
+    literals = set(clause)
+    literals.update(other)
+    for literal in other:
+        if -literal in literals:
+            return None
+    return tuple(sorted(literals))
+
+
+def columns(variables, block=0, size=BLOCK_VARIABLES):
+    """
+    Returns a list of integers giving the value of each variable in one
+    block of models, with a bit per model, and the integer with every
+    model's bit set.
+
+    The first size variables take every combination of values within
+    the block; later ones are fixed by the bits of block.
+    """
+    low = min(variables, size)
+    result, full = patterns(low)
+    result = list(result)
+    for i in range(low, variables):
+        result.append(full if block >> (i - low) & 1 else 0)
+    return result, full
+
+
+@functools.lru_cache(maxsize=None)
+def patterns(variables):
+    """
+    Returns a tuple of integers giving the value of each variable in
+    every combination of values, one bit per model, and the integer
+    with all 2 ** variables bits set.
+    """
+    size = 1 << variables
+    result = []
+    for i in range(variables):
+        half = 1 << i
+        pattern = ((1 << half) - 1) << half
+        period = 2 * half
+        while period < size:
+            pattern |= pattern << period
+            period *= 2
+        result.append(pattern)
+    return tuple(result), (1 << size) - 1
+
+
+# Clauses of recently checked sentences, by sentence, polarity and symbols
+cnf_cache = {}
+
+
+def cached_clauses(sentence, ids, positive=True):
+    """
+    Returns sentence.clauses(ids, positive), reusing the clauses of an
+    equal sentence converted with the same IDs before.
+    """
+    key = (sentence, positive, tuple(ids))
+    clauses = cnf_cache.get(key)
+    if clauses is None:
+        clauses = sentence.clauses(ids, positive)
+        if len(cnf_cache) >= CNF_CACHE_SIZE:
+            cnf_cache.clear()
+        cnf_cache[key] = clauses
+    return clauses
+
+
+def satisfying(clauses, values, full):
+    """
+    Returns the models, as bits of an integer, that satisfy every clause,
+    given each variable's values as returned by columns(). Variable IDs
+    in clauses are 1-based indices into values.
+    """
+    result = full
+    for clause in clauses:
+        satisfied = 0
+        for literal in clause:
+            if literal > 0:
+                satisfied |= values[literal - 1]
+            else:
+                satisfied |= full ^ values[-literal - 1]
+        result &= satisfied
+        if not result:
+            break
+    return result
+
 
 def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    """
+    Checks if knowledge base entails query, that is, whether no model
+    satisfies both knowledge and the negation of query.
+
+    Both are compiled to clauses over integer variables, and each clause
+    is evaluated in up to 2 ** BLOCK_VARIABLES models at once with
+    bitwise operations on integers. Sentences whose CNF would be too
+    large are evaluated bitwise as trees instead.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    ids = {symbol: i for i, symbol in enumerate(symbols, 1)}
+    try:
+        clauses = cached_clauses(knowledge, ids) + cached_clauses(query, ids, False)
+    except CNFTooLarge:
+        clauses = None
+
+    blocks = 1 << max(0, len(symbols) - BLOCK_VARIABLES)
+    for block in range(blocks):
+        values, full = columns(len(symbols), block)
+        if clauses is not None:
+            if satisfying(clauses, values, full):
+                return False
+        else:
+            named = dict(zip(symbols, values))
+            if knowledge.bits(named, full) & ~query.bits(named, full):
+                return False
+    return True
+
+
+def enumerate_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by evaluating both sentences
+    in every model in turn. Much slower than model_check; kept as a
+    reference to check it against.
+    """
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
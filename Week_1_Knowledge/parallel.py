@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+
+from logic import BLOCK_VARIABLES, CNFTooLarge, cached_clauses, columns, satisfying
+
+# Least number of slices per worker, so that slow slices even out
+SLICES_PER_WORKER = 4
+
+
+def model_check(knowledge, query, workers=None, split=None):
+    """
+    Checks if knowledge base entails query, like logic.model_check, with
+    the models enumerated across worker processes (os.cpu_count() by
+    default).
+
+    The models are split into 2 ** split slices (chosen from the number
+    of workers if not given) by fixing the values of the last split
+    symbols. Each worker evaluates a slice in blocks of up to
+    2 ** BLOCK_VARIABLES models at once, bit-sliced over integers, and
+    as soon as any worker finds a model of knowledge in which query is
+    false, every worker stops.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    ids = {symbol: i for i, symbol in enumerate(symbols, 1)}
+    try:
+        problem = (cached_clauses(knowledge, ids) + cached_clauses(query, ids, False), None)
+    except CNFTooLarge:
+        problem = (None, (knowledge, query, symbols))
+
+    workers = workers if workers is not None else os.cpu_count() or 1
+    if split is None:
+        split = (workers * SLICES_PER_WORKER - 1).bit_length() if workers > 1 else 0
+    split = max(0, min(split, len(symbols)))
+    size = min(BLOCK_VARIABLES, len(symbols) - split)
+    slices = [
+        (len(symbols), size, first, first + (1 << (len(symbols) - size - split)))
+        for first in range(0, 1 << (len(symbols) - size), 1 << (len(symbols) - size - split))
+    ]
+
+    if workers <= 1 or len(slices) <= 1:
+        setup(problem, None)
+        return all(check_slice(work) for work in slices)
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context("spawn")
+    found = context.Event()
+    with context.Pool(min(workers, len(slices)), setup, (problem, found)) as pool:
+        for entailed in pool.imap_unordered(check_slice, slices):
+            if not entailed:
+                found.set()
+                return False
+    return True
+
+
+# Problem and stop event of this worker process, set by setup()
+problem = None
+found = None
+
+
+def setup(worker_problem, worker_found):
+    """
+    Worker initializer: keeps the compiled problem, either clauses or
+    (knowledge, query, symbols) to evaluate as trees, and the event
+    set once any worker finds a counter-model.
+    """
+    global problem, found
+    problem, found = worker_problem, worker_found
+
+
+def check_slice(work):
+    """
+    Returns False if a block in the slice (variables, size, first block,
+    end block) has a model of knowledge in which query is false, True
+    if none does or if another worker already found one.
+    """
+    variables, size, first, end = work
+    clauses, trees = problem
+    for block in range(first, end):
+        if found is not None and found.is_set():
+            return True
+        values, full = columns(variables, block, size)
+        if clauses is not None:
+            if satisfying(clauses, values, full):
+                return False
+        else:
+            knowledge, query, symbols = trees
+            named = dict(zip(symbols, values))
+            if knowledge.bits(named, full) & ~query.bits(named, full):
+                return False
+    return True
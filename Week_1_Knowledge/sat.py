@@ -0,0 +1,496 @@
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Sentence, Symbol, model_check
+
+# Compare every answer of entails with model_check when True
+VERIFY = False
+
+# Conflicts before the first restart, and the factor later ones grow by
+RESTART_FIRST = 100
+RESTART_GROWTH = 1.5
+
+# Factor variable activities decay by at each conflict
+ACTIVITY_DECAY = 0.95
+
+
+class VerificationError(Exception):
+    pass
+
+
+class Solver():
+    """
+    CDCL SAT solver over clauses of nonzero integer literals, where -v
+    is the negation of variable v.
+
+    Unit propagation uses two watched literals per clause; conflicts are
+    analyzed to their first unique implication point and the learned
+    clause is kept. Decisions follow variable activity (VSIDS) with
+    saved phases, and the search restarts geometrically.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.watches = {}
+        self.ok = True
+
+        # Per variable, indexed from 1: value (1, -1 or 0 if unassigned),
+        # decision level, index of the clause that implied it, activity
+        # and the value it last had
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [-1]
+
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.order = []
+        self.increment = 1.0
+        self.model = None
+
+    def variable(self, v):
+        """Makes sure variable v and every smaller one exist."""
+        while len(self.values) <= v:
+            u = len(self.values)
+            self.values.append(0)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.activity.append(0.0)
+            self.phases.append(-1)
+            self.watches[u] = []
+            self.watches[-u] = []
+            heapq.heappush(self.order, (0.0, u))
+
+    def new_variable(self):
+        """Returns a fresh variable."""
+        v = len(self.values)
+        self.variable(v)
+        return v
+
+    def value(self, literal):
+        """Returns 1 if literal is true, -1 if false, 0 if unassigned."""
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, literals):
+        """
+        Adds a clause. Returns False if the clauses are now known to be
+        unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        if self.limits:
+            self.backtrack(0)
+        values = self.values
+        clause = []
+        for literal in literals:
+            v = abs(literal)
+            if v >= len(values):
+                self.variable(v)
+            value = values[v] if literal > 0 else -values[v]
+            if value > 0 or -literal in clause:
+                return True
+            if value == 0 and literal not in clause:
+                clause.append(literal)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+        return self.ok
+
+    def attach(self, clause):
+        """Stores a clause of two or more literals, watching its first two."""
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def assign(self, literal, reason):
+        """Makes literal true at the current decision level."""
+        v = abs(literal)
+        self.values[v] = 1 if literal > 0 else -1
+        self.levels[v] = len(self.limits)
+        self.reasons[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by unit clauses. Returns the index
+        of a clause made false, or None if there is no conflict.
+        """
+        values = self.values
+        clauses = self.clauses
+        watches = self.watches
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = watches[false]
+            kept = []
+            conflict = None
+            for position, index in enumerate(watching):
+                clause = clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                value = values[abs(first)]
+                if (value if first > 0 else -value) > 0:
+                    kept.append(index)
+                    continue
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    value = values[abs(other)]
+                    if (value if other > 0 else -value) >= 0:
+                        clause[1], clause[k] = other, false
+                        watches[other].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    value = values[abs(first)]
+                    if (value if first > 0 else -value) < 0:
+                        kept.extend(watching[position + 1:])
+                        conflict = index
+                        break
+                    self.assign(first, index)
+            watches[false] = kept
+            if conflict is not None:
+                return conflict
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns the clause learned from a conflict, with the literal it
+        asserts first, and the decision level to go back to.
+        """
+        level = len(self.limits)
+        learned = [None]
+        seen = set()
+        pending = 0
+        literal = None
+        position = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                v = abs(other)
+                if v in seen or self.levels[v] == 0:
+                    continue
+                seen.add(v)
+                self.bump(v)
+                if self.levels[v] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+        learned[0] = -literal
+
+        back = 0
+        for k in range(1, len(learned)):
+            if self.levels[abs(learned[k])] > back:
+                back = self.levels[abs(learned[k])]
+                learned[1], learned[k] = learned[k], learned[1]
+        return learned, back
+
+    def bump(self, v):
+        """Raises the activity of a variable involved in a conflict."""
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.order = [(-self.activity[u], u) for u in range(1, len(self.values)) if not self.values[u]]
+            heapq.heapify(self.order)
+        elif not self.values[v]:
+            heapq.heappush(self.order, (-self.activity[v], v))
+
+    def backtrack(self, level):
+        """Undoes every assignment made above a decision level."""
+        if len(self.limits) <= level:
+            return
+        for literal in self.trail[self.limits[level]:]:
+            v = abs(literal)
+            self.phases[v] = self.values[v]
+            self.values[v] = 0
+            self.reasons[v] = None
+            heapq.heappush(self.order, (-self.activity[v], v))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the unassigned variable of highest activity, or None."""
+        while self.order:
+            _, v = heapq.heappop(self.order)
+            if not self.values[v]:
+                return v
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses, together with the assumed literals,
+        are satisfiable, leaving a satisfying assignment in self.model
+        (a dict of variable to bool). Assumptions only hold for this
+        call; learned clauses are kept for later ones.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+        for literal in assumptions:
+            self.variable(abs(literal))
+
+        conflicts = 0
+        restart = RESTART_FIRST
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.limits:
+                    self.ok = False
+                    return False
+                conflicts += 1
+                learned, back = self.analyze(conflict)
+                self.increment /= ACTIVITY_DECAY
+                self.backtrack(back)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.assign(learned[0], self.attach(learned))
+                continue
+
+            if conflicts >= restart:
+                conflicts = 0
+                restart = int(restart * RESTART_GROWTH)
+                self.backtrack(0)
+                continue
+
+            # Assumptions are decided first, one decision level each
+            literal = None
+            while len(self.limits) < len(assumptions):
+                assumed = assumptions[len(self.limits)]
+                value = self.value(assumed)
+                if value < 0:
+                    self.backtrack(0)
+                    return False
+                self.limits.append(len(self.trail))
+                if value == 0:
+                    literal = assumed
+                    break
+            if literal is None:
+                v = self.decide()
+                if v is None:
+                    self.model = {u: self.values[u] > 0 for u in range(1, len(self.values))}
+                    self.backtrack(0)
+                    return True
+                literal = v if self.phases[v] > 0 else -v
+                self.limits.append(len(self.trail))
+            self.assign(literal, None)
+
+
+class Encoder():
+    """
+    Tseitin encoding of sentences into a Solver's clauses: each compound
+    sentence gets a variable equivalent to it, so the clauses grow
+    linearly with the sentence. Symbols keep one variable each by name.
+    """
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.symbols = {}
+        self.nodes = {}
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to sentence."""
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.symbols:
+                self.symbols[sentence.name] = self.solver.new_variable()
+            return self.symbols[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+
+        key = id(sentence)
+        if key in self.nodes:
+            return self.nodes[key][0]
+        add = self.solver.add_clause
+        if isinstance(sentence, And):
+            children = [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            v = self.solver.new_variable()
+            for child in children:
+                add([-v, child])
+            add([v] + [-child for child in children])
+        elif isinstance(sentence, Or):
+            children = [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            v = self.solver.new_variable()
+            for child in children:
+                add([v, -child])
+            add([-v] + children)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            v = self.solver.new_variable()
+            add([-v, -a, b])
+            add([v, a])
+            add([v, -b])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            v = self.solver.new_variable()
+            add([-v, -a, b])
+            add([-v, a, -b])
+            add([v, a, b])
+            add([v, -a, -b])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        # Keep the sentence alive so its id is not reused
+        self.nodes[key] = (v, sentence)
+        return v
+
+    def assert_sentence(self, sentence, positive=True):
+        """
+        Adds clauses making sentence true (or false, if not positive),
+        without Tseitin variables for the top-level conjunctions and
+        disjunctions of literals that clauses express directly.
+        """
+        if isinstance(sentence, Not):
+            self.assert_sentence(sentence.operand, not positive)
+        elif isinstance(sentence, And) and positive:
+            for conjunct in sentence.conjuncts:
+                self.assert_sentence(conjunct)
+        elif isinstance(sentence, Or) and not positive:
+            for disjunct in sentence.disjuncts:
+                self.assert_sentence(disjunct, False)
+        elif isinstance(sentence, Implication) and not positive:
+            self.assert_sentence(sentence.antecedent)
+            self.assert_sentence(sentence.consequent, False)
+        elif isinstance(sentence, Or):
+            self.solver.add_clause([self.literal(disjunct) for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, And):
+            self.solver.add_clause([-self.literal(conjunct) for conjunct in sentence.conjuncts])
+        elif isinstance(sentence, Implication):
+            self.solver.add_clause([-self.literal(sentence.antecedent),
+                                    self.literal(sentence.consequent)])
+        else:
+            literal = self.literal(sentence)
+            self.solver.add_clause([literal if positive else -literal])
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that keeps one solver for its whole life: sentences
+    are added to it incrementally and queries are answered under
+    assumptions, so clauses learned answering one query speed up the
+    next. Sentences should not be changed after they are added.
+    """
+
+    def __init__(self, *sentences, verify=None):
+        self.solver = Solver()
+        self.encoder = Encoder(self.solver)
+        self.sentences = []
+        self.verify = verify
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.encoder.assert_sentence(sentence)
+        self.sentences.append(sentence)
+
+    def satisfiable(self, assumptions=()):
+        """
+        Returns True if the knowledge base, with every sentence in
+        assumptions taken to be true, has a model.
+        """
+        literals = [self.encoder.literal(assumption) for assumption in assumptions]
+        return self.solver.solve(literals)
+
+    def entails(self, query, assumptions=()):
+        """
+        Checks if the knowledge base entails query when every sentence
+        in assumptions is taken to be true.
+        """
+        return self.entailed([query], assumptions) == [query]
+
+    def entailed(self, queries, assumptions=()):
+        """
+        Returns the sentences in queries that the knowledge base entails
+        when every sentence in assumptions is taken to be true.
+
+        One solve finds a model; only queries true in it can be entailed.
+        Each remaining candidate is checked by assuming it false, and
+        every model found along the way rules out the candidates it
+        makes false, so most queries never need a solve of their own.
+        """
+        queries = list(queries)
+        literals = [self.encoder.literal(assumption) for assumption in assumptions]
+        targets = [self.encoder.literal(query) for query in queries]
+
+        solver = self.solver
+        if not solver.solve(literals):
+            result = queries
+        else:
+            candidates = [k for k in range(len(queries)) if holds(solver.model, targets[k])]
+            entailed = set()
+            while candidates:
+                k = candidates.pop()
+                if not solver.solve(literals + [-targets[k]]):
+                    entailed.add(k)
+                else:
+                    model = solver.model
+                    candidates = [j for j in candidates if holds(model, targets[j])]
+            result = [query for k, query in enumerate(queries) if k in entailed]
+
+        if self.verify if self.verify is not None else VERIFY:
+            knowledge = And(*self.sentences, *assumptions)
+            for query in queries:
+                expected = model_check(knowledge, query)
+                if (query in result) != expected:
+                    raise VerificationError(
+                        f"KnowledgeBase gave {query in result} but model_check gave {expected} "
+                        f"for {knowledge.formula()} entailing {query.formula()}"
+                    )
+        return result
+
+
+def holds(model, literal):
+    """Returns True if literal is true in a solver model."""
+    return model[abs(literal)] == (literal > 0)
+
+
+def entails(knowledge, query, verify=None):
+    """
+    Checks if knowledge base entails query, like model_check, by showing
+    with the SAT solver that knowledge and the negation of query cannot
+    both be true.
+
+    If verify (or VERIFY, by default) is True, the answer is checked
+    against model_check, raising VerificationError if they differ.
+    """
+    solver = Solver()
+    encoder = Encoder(solver)
+    encoder.assert_sentence(knowledge)
+    encoder.assert_sentence(query, False)
+    result = not solver.solve()
+
+    if verify if verify is not None else VERIFY:
+        expected = model_check(knowledge, query)
+        if result != expected:
+            raise VerificationError(
+                f"entails gave {result} but model_check gave {expected} "
+                f"for {knowledge.formula()} entailing {query.formula()}"
+            )
+    return result